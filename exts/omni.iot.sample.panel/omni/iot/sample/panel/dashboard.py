@@ -0,0 +1,184 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import omni.ui as ui
+
+ROW_HEIGHT = 22
+NAME_WIDTH = 150
+# rows built before the scrolling frame has been laid out and has a height
+DEFAULT_VISIBLE_ROWS = 20
+
+
+class uiDashboardStyles:
+    header = {"margin": 4, "color": 0xFFFFFFFF, "font_size": 16, "alignment": ui.Alignment.LEFT_CENTER}
+    cell = {"margin": 4, "color": 0xFFDDDDDD, "font_size": 14, "alignment": ui.Alignment.LEFT_CENTER}
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+class IotDashboard:
+    # lists every device prim under the IoT root with its key attributes. Only the rows visible in
+    # the scrolling frame are built, between two spacers that stand in for the rows above and below
+    # them. Scrolling binds the same rows to other devices, so the cost of the view does not depend
+    # on the number of devices
+    def __init__(self, stage, iot_path, attr_names):
+        self._stage = stage
+        self._iot_path = iot_path
+        self._attr_names = list(attr_names)
+        self._key_names = set(attr_names)
+        # the device prim paths in the order of the rows, and the row of each device
+        self._devices = []
+        self._device_indices = {}
+        # each row is its name label, its value labels and the attributes of the device bound to it
+        self._rows = []
+        self._row_devices = []
+        self._first = 0
+        self._frame = None
+        self._content = None
+        self._top = None
+        self._bottom = None
+        # the devices changed since the last refresh, and whether the device list needs a rescan
+        self._dirty_devices = {}
+        self._dirty_layout = True
+        self._dirty_rows = False
+
+    def build(self):
+        # called within the container the dashboard is shown in
+        with ui.HStack(height=ROW_HEIGHT):
+            ui.Label("Device", style=uiDashboardStyles.header, width=NAME_WIDTH)
+            for attr_name in self._attr_names:
+                ui.Label(attr_name, style=uiDashboardStyles.header)
+        self._frame = ui.ScrollingFrame()
+        self._frame.set_scroll_y_changed_fn(self._on_scrolled)
+        with self._frame:
+            self._content = ui.VStack()
+        # the spacers exist even while there are no devices
+        self._build_rows(0)
+        self._dirty_layout = True
+
+    def invalidate(self):
+        self._dirty_layout = True
+
+    def is_dirty(self):
+        return self._dirty_layout or self._dirty_rows or len(self._dirty_devices) > 0
+
+    def _device_path(self, path):
+        # the device prim the path is in, None if it is not below a device
+        prim_path = path.GetPrimPath()
+        depth = self._iot_path.pathElementCount + 1
+        if prim_path.pathElementCount < depth or not prim_path.HasPrefix(self._iot_path):
+            return None
+        while prim_path.pathElementCount > depth:
+            prim_path = prim_path.GetParentPath()
+        return prim_path
+
+    def on_objects_changed(self, notice):
+        # index the changed paths by device, the rows are only updated by refresh
+        for p in notice.GetResyncedPaths():
+            if self._iot_path.HasPrefix(p) or (p.IsPrimPath() and p.GetParentPath() == self._iot_path):
+                # a device was added or removed
+                self._dirty_layout = True
+            else:
+                device_path = self._device_path(p)
+                if device_path is not None:
+                    self._dirty_devices[device_path] = True
+
+        for p in notice.GetChangedInfoOnlyPaths():
+            if p.IsPropertyPath() and p.name in self._key_names:
+                device_path = self._device_path(p)
+                if device_path is not None:
+                    self._dirty_devices[device_path] = True
+
+    def _on_scrolled(self, y):
+        self._dirty_rows = True
+
+    def _scan(self):
+        iot_prim = self._stage.GetPrimAtPath(self._iot_path)
+        self._devices = [child.GetPath() for child in iot_prim.GetChildren()] if iot_prim else []
+        self._device_indices = {device_path: index for index, device_path in enumerate(self._devices)}
+
+    def _build_rows(self, count):
+        self._content.clear()
+        self._rows = []
+        with self._content:
+            self._top = ui.Spacer(height=0)
+            for _ in range(count):
+                with ui.HStack(height=ROW_HEIGHT):
+                    name_label = ui.Label("", style=uiDashboardStyles.cell, width=NAME_WIDTH)
+                    value_labels = [ui.Label("", style=uiDashboardStyles.cell) for _ in self._attr_names]
+                self._rows.append([name_label, value_labels, []])
+            self._bottom = ui.Spacer(height=0)
+        self._row_devices = [None] * count
+
+    def _bind(self, row_index, device_path):
+        name_label, value_labels, attributes = self._rows[row_index]
+        self._row_devices[row_index] = device_path
+        prim = self._stage.GetPrimAtPath(device_path)
+        name_label.text = device_path.name
+        attributes[:] = [prim.GetAttribute(attr_name) if prim else None for attr_name in self._attr_names]
+        self._update_row(row_index)
+
+    def _update_row(self, row_index):
+        _, value_labels, attributes = self._rows[row_index]
+        for value_label, attribute in zip(value_labels, attributes):
+            value_label.text = _format(attribute.Get() if attribute else None)
+
+    def refresh(self):
+        # apply the changes since the last refresh to the visible rows
+        if self._content is None:
+            return
+        rebind = self._dirty_layout or self._dirty_rows
+        if self._dirty_layout:
+            self._scan()
+        height = self._frame.computed_height
+        count = int(height // ROW_HEIGHT) + 2 if height > 0 else DEFAULT_VISIBLE_ROWS
+        count = min(count, len(self._devices))
+        if count != len(self._rows):
+            self._build_rows(count)
+            rebind = True
+
+        if rebind:
+            first = min(int(self._frame.scroll_y // ROW_HEIGHT), len(self._devices) - count)
+            self._first = max(first, 0)
+            self._top.height = ui.Pixel(self._first * ROW_HEIGHT)
+            self._bottom.height = ui.Pixel((len(self._devices) - self._first - count) * ROW_HEIGHT)
+            for row_index in range(count):
+                device_path = self._devices[self._first + row_index]
+                bound = device_path == self._row_devices[row_index]
+                if self._dirty_layout or not bound or device_path in self._dirty_devices:
+                    self._bind(row_index, device_path)
+        else:
+            # only the rows of changed devices that are visible are updated
+            for device_path in self._dirty_devices:
+                row_index = self._device_indices.get(device_path, -1) - self._first
+                if 0 <= row_index < len(self._rows):
+                    self._bind(row_index, device_path)
+
+        self._dirty_layout = False
+        self._dirty_rows = False
+        self._dirty_devices = {}
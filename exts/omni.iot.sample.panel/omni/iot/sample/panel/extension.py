@@ -19,13 +19,44 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+import collections
+import fnmatch
+import time
+import carb.settings
 import omni.ext
+import omni.kit.app
 import omni.ui as ui
-from pxr import Usd, Sdf, Tf, UsdGeom
+from pxr import Gf, Usd, Sdf, Tf, UsdGeom
 import omni.ui.color_utils as cl
+from .dashboard import IotDashboard
 
 TRANSLATE_OFFSET = "xformOp:translate:offset"
 ROTATE_SPIN = "xformOp:rotateX:spin"
+# the cube moves down the belt from CUBE_START over CUBE_TRAVEL units and the rollers turn with the belt
+CUBE_START = -20.0
+CUBE_TRAVEL = 930.0
+ROLLER_DEGREES_PER_UNIT = 1440.0 / CUBE_TRAVEL
+# the class prim in the session layer that holds the spin of the rollers, each roller inherits it
+ROLLER_CLASS_PATH = "/_IotRollers"
+# the latencies of the last LATENCY_WINDOW updates are used for the percentiles
+LATENCY_WINDOW = 1000
+# the most times per second the panel is refreshed, the changes in between are coalesced
+REFRESH_RATE_SETTING = "/exts/omni.iot.sample.panel/refresh_rate"
+DEFAULT_REFRESH_RATE = 30.0
+# the attributes of each device listed by the dashboard
+DASHBOARD_ATTRIBUTES_SETTING = "/exts/omni.iot.sample.panel/dashboard_attributes"
+DEFAULT_DASHBOARD_ATTRIBUTES = ["_ts", "Velocity"]
+# the roller prims of the conveyor belt, animated while it runs
+ROLLER_PATTERN_SETTING = "/exts/omni.iot.sample.panel/roller_pattern"
+DEFAULT_ROLLER_PATTERN = "/World/Geometry/SM_ConveyorBelt_A08_Roller*_01"
+# the stage units per second the belt moves at for a Velocity of 1
+VELOCITY_SCALE_SETTING = "/exts/omni.iot.sample.panel/velocity_scale"
+DEFAULT_VELOCITY_SCALE = 100.0
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
 
 
 class uiTextStyles:
@@ -46,54 +77,118 @@ class uiButtonStyles:
     # geometry manipulation
 
 
-class LiveCube:
-    def __init__(self, stage: Usd.Stage, path: str):
-        self._prim = stage.GetPrimAtPath(path)
-        self._op = self._prim.HasProperty(TRANSLATE_OFFSET)
-        if self._prim:
-            self._xform = UsdGeom.Xformable(self._prim)
-
-    def resume(self):
-        if self._xform and not self._op:
-            op = self._xform.AddTranslateOp(opSuffix="offset")
-            op.Set(time=1, value=(0, -20.0, 0))
-            op.Set(time=192, value=(0, -950, 0))
-            self._op = True
-
-    def pause(self):
-        if self._xform and self._op:
-            default_ops = []
-            for op in self._xform.GetOrderedXformOps():
-                if op.GetOpName() != TRANSLATE_OFFSET:
-                    default_ops.append(op)
-            self._xform.SetXformOpOrder(default_ops)
-            self._prim.RemoveProperty(TRANSLATE_OFFSET)
-            self._op = False
-
-
-class LiveRoller:
+def cube_offset(distance):
+    # the cube travels down the belt and starts over at the top
+    return Gf.Vec3d(0, CUBE_START - distance % CUBE_TRAVEL, 0)
+
+
+def roller_angle(distance):
+    return distance * ROLLER_DEGREES_PER_UNIT % 360.0
+
+
+def _op_order(stage: Usd.Stage, path: Sdf.Path, op_name: str):
+    # the op order of the prim with op_name last
+    prim = stage.GetPrimAtPath(path)
+    order = UsdGeom.Xformable(prim).GetXformOpOrderAttr().Get() if prim else None
+    return [op for op in (order or []) if op != op_name] + [op_name]
+
+
+def _set_op_order(prim_spec, order):
+    order_spec = prim_spec.attributes.get(UsdGeom.Tokens.xformOpOrder)
+    if not order_spec:
+        order_spec = Sdf.AttributeSpec(
+            prim_spec, UsdGeom.Tokens.xformOpOrder, Sdf.ValueTypeNames.TokenArray, Sdf.VariabilityUniform
+        )
+    order_spec.default = order
+
+
+def _remove_properties(layer, path, names):
+    prim_spec = layer.GetPrimAtPath(path)
+    if not prim_spec:
+        return None
+    for name in names:
+        attr_spec = prim_spec.attributes.get(name)
+        if attr_spec:
+            prim_spec.RemoveProperty(attr_spec)
+    return prim_spec
+
+
+class LiveAnimation:
+    # an xform op of a prim driven by the distance the belt has moved, value maps the distance to the
+    # value of the op. The op is added once, to the session layer so that the motion is local to each
+    # client and never saved, after that only its value changes. A change of speed does not touch any
+    # keyframes or the op order of the prim. paths are the prims whose changes are the animation's own
+    def __init__(self, stage: Usd.Stage, path: str, op_name: str, type_name, value):
+        self._path = Sdf.Path(path)
+        self._op_name = op_name
+        self._type_name = type_name
+        self._value = value
+        self._attr_spec = None
+        self._order = _op_order(stage, self._path, op_name)
+        self.valid = bool(stage.GetPrimAtPath(self._path))
+        self.paths = [self._path]
+
+    def _add_op(self, layer):
+        prim_spec = Sdf.CreatePrimInLayer(layer, self._path)
+        self._attr_spec = prim_spec.attributes.get(self._op_name)
+        if not self._attr_spec:
+            self._attr_spec = Sdf.AttributeSpec(prim_spec, self._op_name, self._type_name)
+        self._attr_spec.default = self._value(0.0)
+        return prim_spec
+
+    def add(self, layer):
+        _set_op_order(self._add_op(layer), self._order)
+
+    def move(self, distance):
+        self._attr_spec.default = self._value(distance)
+
+    def remove(self, layer):
+        _remove_properties(layer, self._path, [self._op_name, UsdGeom.Tokens.xformOpOrder])
+        self._attr_spec = None
+
+
+class LiveCube(LiveAnimation):
     def __init__(self, stage: Usd.Stage, path: str):
-        self._prim = stage.GetPrimAtPath(path)
-        self._op = self._prim.HasProperty(ROTATE_SPIN)
-        if self._prim:
-            self._xform = UsdGeom.Xformable(self._prim)
-
-    def resume(self):
-        if self._xform and not self._op:
-            op = self._xform.AddRotateXOp(opSuffix="spin")
-            op.Set(time=1, value=0)
-            op.Set(time=192, value=1440)
-            self._op = True
-
-    def pause(self):
-        if self._xform and self._op:
-            default_ops = []
-            for op in self._xform.GetOrderedXformOps():
-                if op.GetOpName() != ROTATE_SPIN:
-                    default_ops.append(op)
-            self._xform.SetXformOpOrder(default_ops)
-            self._prim.RemoveProperty(ROTATE_SPIN)
-            self._op = False
+        super().__init__(stage, path, TRANSLATE_OFFSET, Sdf.ValueTypeNames.Double3, cube_offset)
+
+
+class LiveRollers(LiveAnimation):
+    # the rollers all turn by the same angle, so the op is held by a class prim that each roller
+    # inherits and a frame is a single write however many rollers there are
+    def __init__(self, stage: Usd.Stage, paths):
+        super().__init__(stage, ROLLER_CLASS_PATH, ROTATE_SPIN, Sdf.ValueTypeNames.Float, roller_angle)
+        self._rollers = [Sdf.Path(path) for path in paths if stage.GetPrimAtPath(path)]
+        self._orders = [_op_order(stage, path, ROTATE_SPIN) for path in self._rollers]
+        self.valid = len(self._rollers) > 0
+        self.paths = [self._path] + self._rollers
+
+    def add(self, layer):
+        self._add_op(layer).specifier = Sdf.SpecifierClass
+        for path, order in zip(self._rollers, self._orders):
+            prim_spec = Sdf.CreatePrimInLayer(layer, path)
+            if self._path not in prim_spec.inheritPathList.prependedItems:
+                prim_spec.inheritPathList.Prepend(self._path)
+            _set_op_order(prim_spec, order)
+
+    def remove(self, layer):
+        for path in self._rollers:
+            prim_spec = _remove_properties(layer, path, [UsdGeom.Tokens.xformOpOrder])
+            if prim_spec and self._path in prim_spec.inheritPathList.prependedItems:
+                prim_spec.inheritPathList.prependedItems.remove(self._path)
+        if layer.GetPrimAtPath(self._path):
+            del layer.rootPrims[self._path.name]
+        self._attr_spec = None
+
+
+def find_prims(stage: Usd.Stage, pattern: str):
+    # the paths of the children of the pattern's parent prim whose names match the pattern
+    parent_path, _, name_pattern = pattern.rpartition("/")
+    parent = stage.GetPrimAtPath(parent_path or "/")
+    if not parent:
+        return []
+    return [
+        str(child.GetPath()) for child in parent.GetChildren() if fnmatch.fnmatchcase(child.GetName(), name_pattern)
+    ]
 
 
 # Any class derived from `omni.ext.IExt` in top level module (defined in `python.modules` of `extension.toml`) will be
@@ -108,6 +203,33 @@ class OmniIotSamplePanelExtension(omni.ext.IExt):
         self._usd_context = omni.usd.get_context()
         self._stage = self._usd_context.get_stage()
         self._selected_prim = None
+        # the button of each property of the selected prim, by property name
+        self._property_buttons = {}
+        # the properties changed since the last refresh, and whether the buttons need to be rebuilt
+        self._dirty_names = {}
+        self._dirty_layout = False
+        refresh_rate = carb.settings.get_settings().get(REFRESH_RATE_SETTING)
+        if refresh_rate is None:
+            refresh_rate = DEFAULT_REFRESH_RATE
+        self._refresh_interval = 1.0 / refresh_rate if refresh_rate > 0 else 0.0
+        self._last_refresh = 0.0
+        self._update_sub = None
+        # every device under /iot can be listed instead of the properties of the selected prim
+        self._dashboard = None
+        self._dashboard_visible = False
+        # the animations of the belt are driven every frame by the distance moved at the latest Velocity
+        self._animations = []
+        self._animated_paths = set()
+        self._belt_velocity = 0.0
+        self._belt_distance = 0.0
+        self._last_frame = None
+        self._velocity_scale = carb.settings.get_settings().get(VELOCITY_SCALE_SETTING)
+        if self._velocity_scale is None:
+            self._velocity_scale = DEFAULT_VELOCITY_SCALE
+        # publish->USD and USD->UI latencies of the updates traced by the ingest app
+        self._last_written = None
+        self._publish_latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._ui_latencies = collections.deque(maxlen=LATENCY_WINDOW)
 
         live_layer_path = None
         root_layer = self._stage.GetRootLayer()
@@ -119,8 +241,6 @@ class OmniIotSamplePanelExtension(omni.ext.IExt):
         self._window = ui.Window("Sample IoT Data", width=350, height=380)
         self._window.frame.set_style(uiElementStyles.mainWindow)
         self._stage.SetEditTarget(root_layer)
-        root_layer.startTimeCode = 1
-        root_layer.endTimeCode = 192
         UsdGeom.SetStageUpAxis(self._stage, UsdGeom.Tokens.z)
 
         if live_layer_path:
@@ -130,78 +250,126 @@ class OmniIotSamplePanelExtension(omni.ext.IExt):
                     live_layer = sub_layer
 
             if live_layer:
-                live_layer.startTimeCode = 1
-                live_layer.endTimeCode = 192
                 # self._stage.SetEditTarget(live_layer)
                 self._iot_prim = self._stage.GetPrimAtPath("/iot")
-                self._cube = LiveCube(self._stage, "/World/Cube")
-                self._rollers = []
-
-                for x in range(38):
-                    self._rollers.append(
-                        LiveRoller(self._stage, f"/World/Geometry/SM_ConveyorBelt_A08_Roller{x+1:02d}_01")
-                    )
+                roller_pattern = carb.settings.get_settings().get(ROLLER_PATTERN_SETTING) or DEFAULT_ROLLER_PATTERN
+                self._animations = [
+                    LiveCube(self._stage, "/World/Cube"),
+                    LiveRollers(self._stage, find_prims(self._stage, roller_pattern)),
+                ]
+                self._animations = [animation for animation in self._animations if animation.valid]
+                self._animated_paths = {path for animation in self._animations for path in animation.paths}
+                with Sdf.ChangeBlock():
+                    for animation in self._animations:
+                        animation.add(self._stage.GetSessionLayer())
 
                 # this will capture when the select changes in the stage_selected_iot_prim_label
                 self._stage_event_sub = self._usd_context.get_stage_event_stream().create_subscription_to_pop(
                     self._on_stage_event, name="Stage Update"
                 )
 
+                dashboard_attributes = carb.settings.get_settings().get(DASHBOARD_ATTRIBUTES_SETTING)
+                if dashboard_attributes is None:
+                    dashboard_attributes = DEFAULT_DASHBOARD_ATTRIBUTES
+                self._dashboard = IotDashboard(self._stage, Sdf.Path("/iot"), dashboard_attributes)
+
                 # this will capture changes to the IoT data
                 self.listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, self._stage)
 
+                # the changes are applied to the panel once per frame at most
+                self._update_sub = (
+                    omni.kit.app.get_app()
+                    .get_update_event_stream()
+                    .create_subscription_to_pop(self._on_update, name="IoT Panel Refresh")
+                )
+
                 # create an simple window with empty VStack for the IoT data
                 with self._window.frame:
                     with ui.VStack():
                         with ui.HStack(height=22):
                             ui.Label("IoT Prim:", style=uiTextStyles.title, width=75)
                             self._selected_iot_prim_label = ui.Label(" ", style=uiTextStyles.title)
+                        with ui.HStack(height=22):
+                            ui.Label("Latency:", style=uiTextStyles.title, width=75)
+                            self._latency_label = ui.Label("not traced", style=uiTextStyles.title)
+                        self._dashboard_button = ui.Button(
+                            "Show All Devices", height=22, clicked_fn=self._on_dashboard_toggled
+                        )
                         self._property_stack = ui.VStack(height=22)
+                        self._dashboard_stack = ui.VStack(visible=False)
+                        with self._dashboard_stack:
+                            self._dashboard.build()
 
                 if self._iot_prim:
                     self._on_selected_prim_changed()
 
     def on_shutdown(self):
         print("[omni.iot.sample.panel] shutdown")
+        if self._update_sub is not None:
+            self._update_sub.unsubscribe()
+            self._update_sub = None
+        with Sdf.ChangeBlock():
+            for animation in self._animations:
+                animation.remove(self._stage.GetSessionLayer())
+        self._animations = []
 
     def _on_velocity_changed(self, speed):
-        print(f"[omni.iot.sample.panel] _on_velocity_changed: {speed}")
-        if speed is not None and speed > 0.0:
-            with Sdf.ChangeBlock():
-                self._cube.resume()
-                for roller in self._rollers:
-                    roller.resume()
-        else:
-            with Sdf.ChangeBlock():
-                self._cube.pause()
-                for roller in self._rollers:
-                    roller.pause()
-
-    def _update_frame(self):
-        if self._selected_prim is not None:
-            self._property_stack.clear()
-            properties = self._selected_prim.GetProperties()
-            button_height = uiButtonStyles.mainButton["Button"]["height"]
-            self._property_stack.height.value = (round(len(properties) / 2) + 1) * button_height
-            x = 0
-            hStack = ui.HStack()
-            self._property_stack.add_child(hStack)
-            # repopulate the VStack with the IoT data attributes
-            for prop in properties:
-                if x > 0 and x % 2 == 0:
-                    hStack = ui.HStack()
-                    self._property_stack.add_child(hStack)
-                prop_name = prop.GetName()
-                prop_value = prop.Get()
-                ui_button = ui.Button(f"{prop_name}\n{str(prop_value)}", style=uiButtonStyles.mainButton)
-                hStack.add_child(ui_button)
-                if prop_name == "Velocity":
-                    self._on_velocity_changed(prop_value)
-                x += 1
-
-            if x % 2 != 0:
-                with hStack:
-                    ui.Button("", style=uiButtonStyles.mainButton)
+        # only the speed of the driver changes, the stage is edited by _animate
+        self._belt_velocity = float(speed) if speed is not None else 0.0
+
+    def _animate(self):
+        # move the belt by the distance covered at the latest Velocity since the last frame, nothing
+        # is written while it stands still
+        now = time.monotonic()
+        elapsed = now - self._last_frame if self._last_frame is not None else 0.0
+        self._last_frame = now
+        if self._belt_velocity == 0.0 or len(self._animations) == 0:
+            return
+        self._belt_distance += self._belt_velocity * self._velocity_scale * elapsed
+        with Sdf.ChangeBlock():
+            for animation in self._animations:
+                animation.move(self._belt_distance)
+
+    def _build_frame(self):
+        # the buttons of the properties are created once per selected prim and kept by property name,
+        # updates only change the text of the buttons. The layout is only rebuilt when properties
+        # are added or removed
+        self._property_stack.clear()
+        self._property_buttons = {}
+        if self._selected_prim is None or not self._selected_prim.IsValid():
+            return
+
+        properties = self._selected_prim.GetProperties()
+        button_height = uiButtonStyles.mainButton["Button"]["height"]
+        self._property_stack.height.value = (round(len(properties) / 2) + 1) * button_height
+        x = 0
+        hStack = ui.HStack()
+        self._property_stack.add_child(hStack)
+        # populate the VStack with the IoT data attributes
+        for prop in properties:
+            if x > 0 and x % 2 == 0:
+                hStack = ui.HStack()
+                self._property_stack.add_child(hStack)
+            ui_button = ui.Button("", style=uiButtonStyles.mainButton)
+            hStack.add_child(ui_button)
+            self._property_buttons[prop.GetName()] = ui_button
+            x += 1
+
+        if x % 2 != 0:
+            with hStack:
+                ui.Button("", style=uiButtonStyles.mainButton)
+
+        self._update_properties(list(self._property_buttons))
+
+    def _update_properties(self, prop_names):
+        for prop_name in prop_names:
+            ui_button = self._property_buttons.get(prop_name)
+            if ui_button is None:
+                continue
+            prop_value = self._selected_prim.GetProperty(prop_name).Get()
+            ui_button.text = f"{prop_name}\n{str(prop_value)}"
+            if prop_name == "Velocity":
+                self._on_velocity_changed(prop_value)
 
     def _on_selected_prim_changed(self):
         print("[omni.iot.sample.panel] _on_selected_prim_changed")
@@ -217,8 +385,13 @@ class OmniIotSamplePanelExtension(omni.ext.IExt):
                 and sdf_path != self._iot_prim.GetPath()
             ):
                 self._selected_prim = self._stage.GetPrimAtPath(sdf_path)
+                self._dirty_names = {}
+                self._dirty_layout = False
+                self._last_written = None
+                self._publish_latencies.clear()
+                self._ui_latencies.clear()
                 self._selected_iot_prim_label.text = str(sdf_path)
-                self._update_frame()
+                self._build_frame()
 
     # ===================== stage events START =======================
     def _on_selection_changed(self):
@@ -236,12 +409,82 @@ class OmniIotSamplePanelExtension(omni.ext.IExt):
             self._on_asset_opened()
 
     def _on_objects_changed(self, notice, stage):
-        updated_objects = []
-        for p in notice.GetChangedInfoOnlyPaths():
-            if p.IsPropertyPath() and p.GetParentPath() == self._selected_prim.GetPath():
-                updated_objects.append(p)
+        # the changes are only recorded here, the panel is refreshed by _on_update. The belt animation
+        # changes the stage every frame, those notices carry no IoT data
+        if len(notice.GetResyncedPaths()) == 0 and all(
+            p.GetPrimPath() in self._animated_paths for p in notice.GetChangedInfoOnlyPaths()
+        ):
+            return
+        if self._dashboard_visible:
+            self._dashboard.on_objects_changed(notice)
+        if self._selected_prim is None:
+            return
+        prim_path = self._selected_prim.GetPath()
+
+        # properties of the prim were added or removed, or the prim itself was resynced
+        for p in notice.GetResyncedPaths():
+            if prim_path.HasPrefix(p) or (p.IsPropertyPath() and p.GetPrimPath() == prim_path):
+                self._dirty_layout = True
+                return
 
-        if len(updated_objects) > 0:
-            self._update_frame()
+        for p in notice.GetChangedInfoOnlyPaths():
+            if p.IsPropertyPath() and p.GetPrimPath() == prim_path:
+                self._dirty_names[p.name] = True
+
+    def _on_update(self, event):
+        # refresh the panel with the changes of all the notices since the last refresh, at most once
+        # every refresh interval
+        self._animate()
+        dashboard_dirty = self._dashboard_visible and self._dashboard.is_dirty()
+        if not self._dirty_layout and len(self._dirty_names) == 0 and not dashboard_dirty:
+            return
+        now = time.monotonic()
+        if now - self._last_refresh < self._refresh_interval:
+            return
+        self._last_refresh = now
+
+        if dashboard_dirty:
+            self._dashboard.refresh()
+        if self._dirty_layout:
+            self._build_frame()
+        elif len(self._dirty_names) > 0:
+            self._update_properties(self._dirty_names)
+        else:
+            return
+        self._dirty_layout = False
+        self._dirty_names = {}
+        self._update_latency()
+
+    def _on_dashboard_toggled(self):
+        # the dashboard only follows the changes while it is shown, it rescans the devices when shown
+        self._dashboard_visible = not self._dashboard_visible
+        self._dashboard_stack.visible = self._dashboard_visible
+        self._property_stack.visible = not self._dashboard_visible
+        self._dashboard_button.text = "Show Selected Prim" if self._dashboard_visible else "Show All Devices"
+        if self._dashboard_visible:
+            self._dashboard.invalidate()
+
+    def _update_latency(self):
+        # _origin is when the ingest app published the values and _written when it wrote them to the
+        # .live layer, both are wall-clock times so the clocks of the machines need to be in sync
+        if self._selected_prim is None or not self._selected_prim.IsValid():
+            return
+        origin = self._selected_prim.GetAttribute("_origin")
+        written = self._selected_prim.GetAttribute("_written")
+        if not origin or not written:
+            return
+        origin_time = origin.Get()
+        written_time = written.Get()
+        if origin_time is None or written_time is None or written_time == self._last_written:
+            return
+        self._last_written = written_time
+        self._publish_latencies.append(written_time - origin_time)
+        self._ui_latencies.append(time.time() - written_time)
+        self._latency_label.text = (
+            f"publish->USD p50 {_percentile(self._publish_latencies, 0.5) * 1000:.0f}ms "
+            f"p99 {_percentile(self._publish_latencies, 0.99) * 1000:.0f}ms, "
+            f"USD->UI p50 {_percentile(self._ui_latencies, 0.5) * 1000:.0f}ms "
+            f"p99 {_percentile(self._ui_latencies, 0.99) * 1000:.0f}ms"
+        )
 
     # ===================== stage events END =======================
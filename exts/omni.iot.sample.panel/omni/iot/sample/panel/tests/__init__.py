@@ -1 +1,3 @@
-from .test_hello_world import *
\ No newline at end of file
+from .test_hello_world import *
+from .test_dashboard import *
+from .test_animation import *
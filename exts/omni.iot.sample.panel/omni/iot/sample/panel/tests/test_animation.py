@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import omni.kit.test
+from pxr import Usd, UsdGeom
+from omni.iot.sample.panel.extension import ROLLER_CLASS_PATH, ROTATE_SPIN, LiveRollers, roller_angle
+
+
+class TestAnimation(omni.kit.test.AsyncTestCase):
+    async def setUp(self):
+        self._stage = Usd.Stage.CreateInMemory()
+        self._paths = [f"/World/Roller{number}" for number in range(3)]
+        for number, path in enumerate(self._paths):
+            UsdGeom.Xform.Define(self._stage, path).AddTranslateOp().Set((number, 0, 0))
+
+    async def tearDown(self):
+        self._stage = None
+
+    def _op_names(self, path):
+        return [op.GetOpName() for op in UsdGeom.Xformable(self._stage.GetPrimAtPath(path)).GetOrderedXformOps()]
+
+    async def test_rollers_share_one_spin(self):
+        rollers = LiveRollers(self._stage, self._paths + ["/World/Missing"])
+        self.assertTrue(rollers.valid)
+        self.assertEqual(len(rollers.paths), 4)
+        session_layer = self._stage.GetSessionLayer()
+        rollers.add(session_layer)
+        rollers.move(100.0)
+
+        # the spin is only authored on the class prim, and every roller turns by its angle
+        spin_spec = session_layer.GetAttributeAtPath(f"{ROLLER_CLASS_PATH}.{ROTATE_SPIN}")
+        self.assertAlmostEqual(spin_spec.default, roller_angle(100.0), places=4)
+        for path in self._paths:
+            self.assertFalse(session_layer.GetAttributeAtPath(f"{path}.{ROTATE_SPIN}"))
+            self.assertEqual(self._op_names(path), ["xformOp:translate", ROTATE_SPIN])
+            spin = self._stage.GetPrimAtPath(path).GetAttribute(ROTATE_SPIN).Get()
+            self.assertAlmostEqual(spin, roller_angle(100.0), places=4)
+
+        # nothing of the animation is left once it is removed
+        rollers.remove(session_layer)
+        self.assertFalse(session_layer.GetPrimAtPath(ROLLER_CLASS_PATH))
+        for path in self._paths:
+            self.assertEqual(self._op_names(path), ["xformOp:translate"])
@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import omni.kit.test
+import omni.ui as ui
+from pxr import Sdf, Usd
+from omni.iot.sample.panel.dashboard import IotDashboard
+
+
+class TestDashboard(omni.kit.test.AsyncTestCase):
+    async def setUp(self):
+        self._stage = Usd.Stage.CreateInMemory()
+        self._stage.DefinePrim("/iot")
+        self._window = ui.Window("IoT Dashboard Test", width=400, height=300)
+
+    async def tearDown(self):
+        self._window.destroy()
+        self._window = None
+        self._stage = None
+
+    def _build(self):
+        dashboard = IotDashboard(self._stage, Sdf.Path("/iot"), ["_ts", "Velocity"])
+        with self._window.frame:
+            with ui.VStack():
+                dashboard.build()
+        return dashboard
+
+    async def test_empty_iot_root(self):
+        # opening the dashboard before any device prim exists must not fail, and leaves it clean
+        dashboard = self._build()
+        dashboard.refresh()
+        self.assertFalse(dashboard.is_dirty())
+
+        # the first device is listed once it appears
+        prim = self._stage.DefinePrim("/iot/A08")
+        prim.CreateAttribute("Velocity", Sdf.ValueTypeNames.Double).Set(1.5)
+        dashboard.invalidate()
+        dashboard.refresh()
+        self.assertFalse(dashboard.is_dirty())
+        self.assertEqual(len(dashboard._rows), 1)
+        name_label, value_labels, _ = dashboard._rows[0]
+        self.assertEqual(name_label.text, "A08")
+        self.assertEqual(value_labels[1].text, "1.5")
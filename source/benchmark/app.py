@@ -0,0 +1,284 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# pip install numpy
+# pip install pandas
+
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from iot_common.metrics import registry
+from iot_common.playback import merge_plans
+from iot_common.schema import extend_schema
+from iot_common.synthetic import synthetic_plan, synthetic_plans
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak RSS is not reported there
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+SOURCE_DIR = Path(SCRIPT_DIR).resolve().parents[0]
+ROOT_DIR = Path(SCRIPT_DIR).resolve().parents[1]
+
+# the synthetic load, devices x attributes values every 1 / rate seconds for duration seconds
+DEVICES = int(os.environ.get("IOT_BENCH_DEVICES", "100"))
+ATTRIBUTES = int(os.environ.get("IOT_BENCH_ATTRIBUTES", "20"))
+RATE = float(os.environ.get("IOT_BENCH_RATE", "10"))
+DURATION = float(os.environ.get("IOT_BENCH_DURATION", "10"))
+SEED = int(os.environ.get("IOT_BENCH_SEED", "0"))
+# replay speed of the CSV ingest scenario, "max" measures throughput, a speed the latency
+SPEED = os.environ.get("IOT_BENCH_SPEED", "max")
+SCENARIOS = os.environ.get("IOT_BENCH_SCENARIOS", "csv,mqtt,geometry")
+# the results are written to OUTPUT and compared to the results of an earlier run in BASELINE
+OUTPUT = os.environ.get("IOT_BENCH_OUTPUT", "benchmark.json")
+BASELINE = os.environ.get("IOT_BENCH_BASELINE", "")
+# set in the process that runs a single scenario
+SCENARIO = os.environ.get("IOT_BENCH_SCENARIO", "")
+RESULT_PATH = os.environ.get("IOT_BENCH_RESULT", "")
+
+# finer than the buckets of the apps, so that the percentiles are within 10% of each other across runs
+LATENCY_BUCKETS = tuple(round(0.0001 * 1.1**i, 7) for i in range(122))
+# the results shown for each scenario and compared to the baseline, and whether higher is better
+COMPARED = [
+    ("messages_per_s", True),
+    ("values_per_s", True),
+    ("latency_p50", False),
+    ("latency_p99", False),
+    ("cpu_percent", False),
+    ("peak_rss_mb", False),
+]
+
+
+def load_app(name):
+    # the apps are scripts rather than packages, so they are loaded from their folder
+    spec = importlib.util.spec_from_file_location(f"{name}_app", SOURCE_DIR.joinpath(name, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_live_layer(work_dir, name):
+    # a local file stands in for the .live layer on Nucleus
+    from pxr import Sdf
+
+    live_layer = Sdf.Layer.CreateNew(os.path.join(work_dir, f"{name}.live.usda"))
+    if not live_layer:
+        raise Exception(f"Could not create the live layer in {work_dir}.")
+    Sdf.PrimSpec(live_layer, "iot", Sdf.SpecifierDef, "IoT Root")
+    return live_layer
+
+
+def bench_csv(work_dir):
+    # the devices are merged into a single plan and replayed by the CSV ingest app
+    from pxr import Sdf
+
+    app = load_app("ingest_app_csv")
+    plans = synthetic_plans(DEVICES, ATTRIBUTES, RATE, DURATION, SEED)
+    plan = merge_plans(plans)
+    live_layer = create_live_layer(work_dir, "csv")
+    with Sdf.ChangeBlock():
+        for iot_topic, device_plan in plans.items():
+            app.initialize_device_prim(live_layer, iot_topic, extend_schema(None, device_plan.attr_names))
+    attr_paths = [f"/iot/{attr_name}" for attr_name in plan.attr_names]
+    return lambda: app.run(None, live_layer, attr_paths, {}, None, plan.batches(), SPEED, 0)
+
+
+def bench_mqtt(work_dir):
+    # the MQTT ingest app handles a single topic, so every attribute of every device is sent in the
+    # messages of one device. They go through the in-process broker to the async pipeline and are
+    # traced, so the publish to USD latency is measured as well
+    os.environ["IOT_LOCAL_BROKER"] = "1"
+    os.environ["IOT_MQTT_BROKER"] = "127.0.0.1:0"
+    os.environ["IOT_TRACE"] = "1"
+    app = load_app("ingest_app_mqtt")
+    plan = synthetic_plan(DEVICES * ATTRIBUTES, RATE, DURATION, SEED)
+    attributes = extend_schema(None, plan.attr_names)
+    live_layer = create_live_layer(work_dir, "mqtt")
+
+    async def initialize_async(iot_topic, attributes):
+        app.initialize_device_prim(live_layer, iot_topic, attributes)
+        return None, live_layer
+
+    app.initialize_async = initialize_async
+    return lambda: asyncio.run(app.run_async("device_0000", plan, attributes))
+
+
+def bench_geometry(work_dir):
+    # the stage and its .live sublayer are local files, the app animates the cube for 20 seconds
+    from pxr import Usd
+
+    app = load_app("transform_geometry")
+    stage = Usd.Stage.CreateNew(os.path.join(work_dir, "geometry.usda"))
+    live_layer = create_live_layer(work_dir, "geometry")
+    stage.GetRootLayer().subLayerPaths.append(live_layer.identifier)
+    stage.SetEditTarget(live_layer)
+    stage.DefinePrim("/World", "Xform")
+    return lambda: app.run(stage, live_layer)
+
+
+# the setup of each scenario, and the counters of its messages and written values
+BENCHMARKS = {
+    "csv": (bench_csv, "batches", "values_written"),
+    "mqtt": (bench_mqtt, "messages_received", "values_written"),
+    "geometry": (bench_geometry, "frames", "frames"),
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name, work_dir):
+    # only the run is measured, the setup of the data and the layers is not
+    setup, messages_name, values_name = BENCHMARKS[name]
+    run = setup(work_dir)
+    registry.reset(LATENCY_BUCKETS)
+    start_times = os.times()
+    start = time.perf_counter()
+    run()
+    wall = time.perf_counter() - start
+    end_times = os.times()
+
+    metrics = registry.to_json()
+    user = end_times.user - start_times.user
+    system = end_times.system - start_times.system
+    messages = metrics["counters"].get(messages_name, 0)
+    values = metrics["counters"].get(values_name, 0)
+    return {
+        "wall": wall,
+        "cpu_user": user,
+        "cpu_system": system,
+        "cpu_percent": 100.0 * (user + system) / wall,
+        "peak_rss_mb": peak_rss_mb(),
+        "messages": messages,
+        "values": values,
+        "messages_per_s": messages / wall,
+        "values_per_s": values / wall,
+        # there is no latency when the CSV data is replayed as fast as possible
+        "latency_p50": registry.quantile("latency", 0.5) if "latency" in metrics["histograms"] else None,
+        "latency_p99": registry.quantile("latency", 0.99) if "latency" in metrics["histograms"] else None,
+        "stages": metrics["timers"],
+        "counters": metrics["counters"],
+        "histograms": metrics["histograms"],
+    }
+
+
+def run_scenario(name, work_dir):
+    # each scenario runs in its own process, so that the peak RSS and the CPU time are its own.
+    # The output of the apps is discarded
+    result_path = os.path.join(work_dir, f"{name}.json")
+    env = dict(os.environ, IOT_BENCH_SCENARIO=name, IOT_BENCH_RESULT=result_path)
+    subprocess.run([sys.executable, os.path.realpath(__file__)], env=env, stdout=subprocess.DEVNULL, check=True)
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(results, baseline):
+    lines = []
+    if results["config"] != baseline.get("config"):
+        lines.append(f"the baseline of commit {baseline.get('commit')} was run with {baseline.get('config')}")
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            if not before.get(key) or result.get(key) is None:
+                continue
+            change = 100.0 * (result[key] - before[key]) / before[key]
+            worse = change < 0 if higher_is_better else change > 0
+            lines.append(
+                f"{name} {key}: {before[key]:.6g} -> {result[key]:.6g} ({change:+.1f}%{' worse' if worse else ''})"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "devices": DEVICES,
+            "attributes": ATTRIBUTES,
+            "rate": RATE,
+            "duration": DURATION,
+            "seed": SEED,
+            "speed": SPEED,
+            "payload_format": os.environ.get("IOT_PAYLOAD_FORMAT", "json"),
+        },
+        "scenarios": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="iot_benchmark_")
+    try:
+        for name in [name.strip() for name in SCENARIOS.split(",") if name.strip()]:
+            if name not in BENCHMARKS:
+                raise Exception(f"Unknown scenario {name}, expected one of {', '.join(BENCHMARKS)}.")
+            result = run_scenario(name, work_dir)
+            results["scenarios"][name] = result
+            print(name, " ".join(f"{key}: {result[key]}" for key, _ in COMPARED))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(OUTPUT, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {OUTPUT}")
+    if BASELINE:
+        with open(BASELINE) as f:
+            print(compare(results, json.load(f)))
+
+
+if __name__ == "__main__":
+    if SCENARIO:
+        import omni.client
+
+        omni.client.initialize()
+        try:
+            result = measure(SCENARIO, os.path.dirname(RESULT_PATH))
+        finally:
+            omni.client.shutdown()
+        with open(RESULT_PATH, "w") as f:
+            json.dump(result, f)
+    else:
+        main()
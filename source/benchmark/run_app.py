@@ -0,0 +1,91 @@
+# Copyright (c) 2023, NVIDIA CORPORATION. All rights reserved.
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto. Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import os
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+
+PLATFORM_SYSTEM = platform.system().lower()
+PLATFORM_MACHINE = platform.machine()
+
+if PLATFORM_MACHINE == "i686" or PLATFORM_MACHINE == "AMD64":
+    PLATFORM_MACHINE = "x86_64"
+
+CURRENT_PLATFORM = f"{PLATFORM_SYSTEM}-{PLATFORM_MACHINE}"
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config", "-c", choices=["debug", "release"], default="release")
+parser.add_argument("--platform", default=CURRENT_PLATFORM)
+parser.add_argument("--devices", default="100", help="synthetic devices")
+parser.add_argument("--attributes", default="20", help="attributes of each device")
+parser.add_argument("--rate", default="10", help="values of each attribute per second")
+parser.add_argument("--duration", default="10", help="seconds of synthetic data")
+parser.add_argument("--seed", default="0", help="seed of the synthetic data")
+parser.add_argument("--speed", default="max", help="replay speed of the CSV ingest scenario, or max")
+parser.add_argument(
+    "--payload-format", default="json", choices=["json", "packed"], help="payload of the MQTT ingest scenario"
+)
+parser.add_argument("--scenarios", default="csv,mqtt,geometry", help="comma separated scenarios to run")
+parser.add_argument("--output", default="benchmark.json", help="JSON file the results are written to")
+parser.add_argument("--baseline", default="", help="JSON results of an earlier run to compare to")
+args = parser.parse_args()
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = Path(SCRIPT_DIR).resolve().parents[1]
+
+BUILD_DIR = ROOT_DIR.joinpath("_build", args.platform, args.config)
+DEPS_DIR = ROOT_DIR.joinpath("_build", "target-deps")
+USD_BIN_DIR = DEPS_DIR.joinpath("usd", args.config, "bin")
+USD_LIB_DIR = DEPS_DIR.joinpath("usd", args.config, "lib")
+CLIENT_LIB_DIR = DEPS_DIR.joinpath("omni_client_library", args.config)
+RESOLVER_DIR = DEPS_DIR.joinpath("omni_usd_resolver", args.config)
+
+EXTRA_PATHS = [str(CLIENT_LIB_DIR), str(USD_BIN_DIR), str(USD_LIB_DIR), str(BUILD_DIR), str(RESOLVER_DIR)]
+EXTRA_PYTHON_PATHS = [
+    str(USD_LIB_DIR.joinpath("python")),
+    str(CLIENT_LIB_DIR.joinpath("bindings-python")),
+    str(BUILD_DIR.joinpath("bindings-python")),
+    str(ROOT_DIR.joinpath("source")),
+]
+
+if PLATFORM_SYSTEM == "windows":
+    os.environ["PATH"] += os.pathsep + os.pathsep.join(EXTRA_PATHS)
+    ot_bin = "carb.omnitrace.plugin.dll"
+else:
+    p = os.environ.get("LD_LIBRARY_PATH", "")
+    p += os.pathsep + os.pathsep.join(EXTRA_PATHS)
+    os.environ["LD_LIBRARY_PATH"] = p
+    ot_bin = "libcarb.omnitrace.plugin.so"
+
+os.environ["OMNI_TRACE_LIB"] = os.path.join(str(DEPS_DIR), "omni-trace", "bin", ot_bin)
+os.environ["PYTHONPATH"] = os.pathsep + os.pathsep.join(EXTRA_PYTHON_PATHS)
+os.environ["IOT_BENCH_DEVICES"] = args.devices
+os.environ["IOT_BENCH_ATTRIBUTES"] = args.attributes
+os.environ["IOT_BENCH_RATE"] = args.rate
+os.environ["IOT_BENCH_DURATION"] = args.duration
+os.environ["IOT_BENCH_SEED"] = args.seed
+os.environ["IOT_BENCH_SPEED"] = args.speed
+os.environ["IOT_PAYLOAD_FORMAT"] = args.payload_format
+os.environ["IOT_BENCH_SCENARIOS"] = args.scenarios
+os.environ["IOT_BENCH_OUTPUT"] = os.path.abspath(args.output)
+os.environ["IOT_BENCH_BASELINE"] = os.path.abspath(args.baseline) if args.baseline else ""
+
+if PLATFORM_SYSTEM == "windows":
+    PYTHON_EXE = DEPS_DIR.joinpath("python", "python")
+else:
+    PYTHON_EXE = DEPS_DIR.joinpath("python", "bin", "python3")
+
+plugin_paths = DEPS_DIR.joinpath("omni_usd_resolver", args.config, "usd", "omniverse", "resources")
+os.environ["PXR_PLUGINPATH_NAME"] = str(plugin_paths)
+REQ_FILE = ROOT_DIR.joinpath("requirements.txt")
+subprocess.run(f"{PYTHON_EXE} -m pip install -r {REQ_FILE}", shell=True)
+result = subprocess.run(
+    [PYTHON_EXE, os.path.join(SCRIPT_DIR, "app.py")],
+    stderr=subprocess.STDOUT,
+)
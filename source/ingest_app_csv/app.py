@@ -26,23 +26,72 @@ import os
 import omni.client
 from pxr import Usd, Sdf
 from pathlib import Path
-import pandas as pd
 import time
+from iot_common.attributes import AttributeIndex, ValueWriter
+from iot_common.cache import columnar_path, load_plan
+from iot_common.filters import DeadbandFilter
+from iot_common.history import HistoryRecorder
+from iot_common.logs import LogBuffer
+from iot_common.metrics import MetricsExporter, registry
+from iot_common.playback import MergedStream, merge_plans, scan_attr_names, stream_batches
+from iot_common.schema import (
+    Attribute,
+    device_schema,
+    extend_schema,
+    reconcile_attributes,
+    schema_names,
+)
+from iot_common.scheduler import Scheduler
 
 OMNI_HOST = os.environ.get("OMNI_HOST", "localhost")
 BASE_URL = "omniverse://" + OMNI_HOST + "/Projects/IoT/Samples/HeadlessApp"
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 CONTENT_DIR = Path(SCRIPT_DIR).resolve().parents[1].joinpath("content")
 
-messages = []
-
-
-def log_handler(thread, component, level, message):
-    # print(message)
-    messages.append((thread, component, level, message))
-
-
-def initialize_device_prim(live_layer, iot_topic):
+# comma separated topics to ingest, each may be a glob pattern matching content/<topic>_iot_data.csv
+IOT_TOPICS = os.environ.get("IOT_TOPICS", "A08_PR_NVD_01")
+# replay speed multiplier, "max" plays back as fast as possible
+REPLAY_SPEED = os.environ.get("IOT_REPLAY_SPEED", "1")
+# skip to this time, either seconds from the start of the data or a timestamp
+REPLAY_SEEK = os.environ.get("IOT_REPLAY_SEEK", "0")
+# maximum live_process() flushes per second, 0 flushes every timestamp
+FLUSH_RATE = float(os.environ.get("IOT_FLUSH_RATE", "0"))
+# stream the CSV in chunks of this many rows, 0 loads the whole file
+CHUNK_SIZE = int(os.environ.get("IOT_CHUNK_SIZE", "0"))
+# keep a parsed copy of the CSV next to it to speed up later starts
+USE_CACHE = os.environ.get("IOT_DATA_CACHE", "1") == "1"
+# without a content/<topic>_schema.json manifest, infer a streamed device's attributes from this many rows.
+# 0 reads every Id of the file
+SCHEMA_SAMPLE = int(os.environ.get("IOT_SCHEMA_SAMPLE", "0"))
+# record the written values as time samples on <topic>.history.usda at this many samples per second of
+# data time, 0 turns recording off
+HISTORY_RATE = float(os.environ.get("IOT_HISTORY_RATE", "0"))
+# samples kept per attribute in the history layer, 0 keeps all
+HISTORY_SAMPLES = int(os.environ.get("IOT_HISTORY_SAMPLES", "3600"))
+# seconds of data time kept in the history layer, 0 keeps all
+HISTORY_AGE = float(os.environ.get("IOT_HISTORY_AGE", "0"))
+# seconds between saves of the history layer
+HISTORY_SAVE_INTERVAL = 30.0
+# only write the values that changed by more than a deadband, see DeadbandFilter
+VALUE_FILTER = os.environ.get("IOT_FILTER", "0") == "1"
+# absolute and relative deadbands of the filter, attributes of a schema manifest may override them
+DEADBAND = float(os.environ.get("IOT_DEADBAND", "0"))
+RELATIVE_DEADBAND = float(os.environ.get("IOT_RELATIVE_DEADBAND", "0"))
+# seconds of data time after which a filtered value is written even if it did not change
+HEARTBEAT = float(os.environ.get("IOT_HEARTBEAT", "60"))
+
+# log messages of the client library kept for a dump on failure or SIGUSR1, and the lowest level kept
+LOG_CAPACITY = int(os.environ.get("IOT_LOG_CAPACITY", "1000"))
+LOG_LEVEL = os.environ.get("IOT_LOG_LEVEL", "WARNING")
+# serve the metrics on http://127.0.0.1:<port>/metrics, 0 turns the endpoint off
+METRICS_PORT = int(os.environ.get("IOT_METRICS_PORT", "0"))
+# write the metrics as JSON to this file every 10 seconds
+METRICS_FILE = os.environ.get("IOT_METRICS_FILE", "")
+
+log_buffer = LogBuffer(LOG_CAPACITY)
+
+
+def initialize_device_prim(live_layer, iot_topic, schema):
     iot_root = live_layer.GetPrimAtPath("/iot")
     if not iot_root:
         iot_root = Sdf.PrimSpec(live_layer, "iot", Sdf.SpecifierDef, "IoT Root")
@@ -53,26 +102,9 @@ def initialize_device_prim(live_layer, iot_topic):
     if not iot_spec:
         raise Exception("Failed to create the IoT Spec.")
 
-    # clear out any attrubutes that may be on the spec
-    for attrib in iot_spec.attributes:
-        iot_spec.RemoveProperty(attrib)
-
-    IOT_TOPIC_DATA = f"{CONTENT_DIR}/{iot_topic}_iot_data.csv"
-    data = pd.read_csv(IOT_TOPIC_DATA)
-    data.head()
-
-    # create all the IoT attributes that will be written
-    attr = Sdf.AttributeSpec(iot_spec, "_ts", Sdf.ValueTypeNames.Double)
-    if not attr:
-        raise Exception(f"Could not define the attribute: {attrName}")
-
-    # infer the unique data points in the CSV.
-    # The values may be known in advance and can be hard coded
-    grouped = data.groupby("Id")
-    for attrName, group in grouped:
-        attr = Sdf.AttributeSpec(iot_spec, attrName, Sdf.ValueTypeNames.Double)
-        if not attr:
-            raise Exception(f"Could not define the attribute: {attrName}")
+    # create the IoT attributes that will be written, the attributes that already exist are kept.
+    # The schema comes from the device manifest or was inferred from the data
+    reconcile_attributes(iot_spec, [Attribute("_ts", "double", None)] + schema)
 
 
 def create_live_layer(iot_topic):
@@ -87,7 +119,7 @@ def create_live_layer(iot_topic):
     return live_layer
 
 
-async def initialize_async(iot_topic):
+async def initialize_async(iot_topic, devices):
     # copy a the Conveyor Belt to the target nucleus server
     LOCAL_URL = f"file:{CONTENT_DIR}/ConveyorBelt_{iot_topic}.usd"
     STAGE_URL = f"{BASE_URL}/ConveyorBelt_{iot_topic}.usd"
@@ -120,62 +152,237 @@ async def initialize_async(iot_topic):
 
     # set the live layer as the edit target
     stage.SetEditTarget(live_layer)
-    initialize_device_prim(live_layer, iot_topic)
+    # create the prims of all the devices as a single change
+    with Sdf.ChangeBlock():
+        for device_topic, schema in devices.items():
+            initialize_device_prim(live_layer, device_topic, schema)
     omni.client.live_process()
     return stage, live_layer
 
 
-def write_to_live(live_layer, iot_topic, group, ts):
-    # write the iot values to the usd prim attributes
-    print(group.iloc[0]["TimeStamp"])
-    ts_attribute = live_layer.GetAttributeAtPath(f"/iot/{iot_topic}._ts")
-    ts_attribute.default = ts
-    with Sdf.ChangeBlock():
-        for index, row in group.iterrows():
-            id = row["Id"]
-            value = row["Value"]
-            attr = live_layer.GetAttributeAtPath(f"/iot/{iot_topic}.{id}")
-            if not attr:
-                raise Exception(f"Could not find attribute /iot/{iot_topic}.{id}.")
-            attr.default = value
-    omni.client.live_process()
+def find_topics(patterns):
+    # expand the topic patterns against the data files in the content folder
+    topics = []
+    for pattern in patterns.split(","):
+        # generated data may be columnar rather than a CSV file
+        matches = sorted(
+            list(CONTENT_DIR.glob(f"{pattern.strip()}_iot_data.csv"))
+            + list(CONTENT_DIR.glob(f"{pattern.strip()}_iot_data.columns"))
+        )
+        if not matches:
+            raise Exception(f"Could not find the data for the topic {pattern}.")
+        for match in matches:
+            topic = match.name[: -len("_iot_data") - len(match.suffix)]
+            if topic not in topics:
+                topics.append(topic)
+    return topics
+
+
+def topic_data_path(iot_topic):
+    return f"{CONTENT_DIR}/{iot_topic}_iot_data.csv"
+
 
+def is_columnar(iot_topic):
+    return not os.path.exists(topic_data_path(iot_topic)) and os.path.isdir(columnar_path(topic_data_path(iot_topic)))
 
-def run(stage, live_layer, iot_topic):
-    # we assume that the file contains the data for single device
-    IOT_TOPIC_DATA = f"{CONTENT_DIR}/{iot_topic}_iot_data.csv"
-    data = pd.read_csv(IOT_TOPIC_DATA)
-    data.head()
 
-    # Converting to DateTime Format and drop ms
-    data["TimeStamp"] = pd.to_datetime(data["TimeStamp"])
-    data["TimeStamp"] = data["TimeStamp"].dt.floor("s")
+def topic_schema(iot_topic, csv_path=None):
+    # the attributes declared in content/<topic>_schema.json, or inferred from a sample of csv_path
+    return device_schema(f"{CONTENT_DIR}/{iot_topic}_schema.json", csv_path, SCHEMA_SAMPLE)
 
-    data.set_index("TimeStamp")
-    start_time = data.min()["TimeStamp"]
-    last_time = start_time
-    grouped = data.groupby("TimeStamp")
 
-    # play back the data in real-time
-    for next_time, group in grouped:
-        diff = (next_time - last_time).total_seconds()
-        if diff > 0:
-            time.sleep(diff)
-        write_to_live(live_layer, iot_topic, group, (next_time - start_time).total_seconds())
-        last_time = next_time
+def plan_schema(iot_topic, plan):
+    # the Ids that are not declared in a manifest are doubles
+    return extend_schema(topic_schema(iot_topic), plan.attr_names)
+
+
+def streamed_schema(iot_topic):
+    # a streamed file is only scanned for its Ids when there is neither a manifest nor a sample
+    schema = topic_schema(iot_topic, topic_data_path(iot_topic))
+    if schema is None:
+        schema = extend_schema(None, scan_attr_names(topic_data_path(iot_topic), CHUNK_SIZE))
+    return schema
+
+
+def create_history(iot_topic):
+    # the history layer is saved next to the stage, it is not a sublayer of the stage because the
+    # defaults of the .live layer would hide its time samples
+    if HISTORY_RATE <= 0:
+        return None
+    return HistoryRecorder(
+        f"{BASE_URL}/{iot_topic}.history.usda", HISTORY_RATE, HISTORY_SAMPLES, HISTORY_AGE, HISTORY_SAVE_INTERVAL
+    )
+
+
+def create_filter(attr_paths, schemas):
+    if not VALUE_FILTER:
+        return None
+    return DeadbandFilter(attr_paths, schemas, DEADBAND, RELATIVE_DEADBAND, HEARTBEAT)
+
+
+def write_to_live(index, ts_attr, writer, ts, attr_indices, values):
+    # write the iot values to the usd prim attributes
+    with index.writing(), Sdf.ChangeBlock():
+        if ts_attr:
+            ts_attr.default = float(ts)
+        writer.write(attr_indices.tolist(), values.tolist(), float(ts))
+
+
+def flush_live(batch_time, oldest_deadline):
+    # send the changes written to the live layer, returns the time of the flush
+    print(batch_time)
+    start = time.perf_counter()
+    omni.client.live_process()
+    registry.add_time("live_process", time.perf_counter() - start)
+    now = time.monotonic()
+    if oldest_deadline is not None:
+        registry.observe("latency", now - oldest_deadline)
+    return now
+
+
+def run(
+    stage,
+    live_layer,
+    attr_paths,
+    schemas,
+    ts_path,
+    batches,
+    speed="1",
+    flush_rate=0.0,
+    history=None,
+    value_filter=None,
+):
+    # each batch holds the values of one timestamp, either from a single device or merged across
+    # devices, in which case the _ts attributes of the devices are part of the batch.
+    # The attribute specs are looked up once, and again only if the index drops any of them
+    index = AttributeIndex(live_layer)
+    writer = ValueWriter(index, attr_paths, schemas, history, value_filter)
+    generation = None
+    flush_interval = 1.0 / flush_rate if flush_rate > 0 else 0.0
+
+    # play back the data in real-time, scaled by speed or as fast as possible
+    scheduler = Scheduler(0.0 if speed == "max" else float(speed))
+    last_flush = time.monotonic()
+    # the deadline of the oldest batch waiting for a flush, for the latency metric
+    oldest_deadline = None
+    # the time of the last batch written and not flushed yet
+    pending = None
+    batches = iter(batches)
+    batch = next(batches, None)
+    while batch is not None:
+        if batch.paced:
+            # the pending writes are flushed when the flush interval expires, not when the next batch is due
+            if pending is not None and scheduler.speed > 0:
+                flush_at = last_flush + flush_interval
+                if scheduler.deadline(batch.ts) > max(flush_at, time.monotonic()):
+                    time.sleep(max(0.0, flush_at - time.monotonic()))
+                    last_flush = flush_live(pending, oldest_deadline)
+                    oldest_deadline = None
+                    pending = None
+            scheduler.wait(batch.ts)
+            if oldest_deadline is None and scheduler.speed > 0:
+                oldest_deadline = scheduler.deadline(batch.ts)
+        if index.refresh() != generation:
+            ts_attr = index.find(*ts_path.rsplit(".", 1)) if ts_path else None
+            generation = index.generation
+        start = time.perf_counter()
+        write_to_live(index, ts_attr, writer, batch.ts, batch.attr_indices, batch.values)
+        registry.count("batches")
+        pending = batch.time
+        parse_start = time.perf_counter()
+        next_batch = next(batches, None)
+        registry.add_time("apply", parse_start - start)
+        registry.add_time("parse", time.perf_counter() - parse_start)
+
+        # when the next timestamp is already late, coalesce it into the same flush.
+        # The catch-up batch written when seeking is always coalesced
+        now = time.monotonic()
+        since_flush = now - last_flush
+        if next_batch is not None and since_flush < scheduler.max_coalesce:
+            if not batch.paced or scheduler.is_late(next_batch.ts):
+                scheduler.coalesce()
+                batch = next_batch
+                continue
+
+        if next_batch is None or since_flush >= flush_interval:
+            flush_live(batch.time, oldest_deadline)
+            oldest_deadline = None
+            pending = None
+            last_flush = now
+        batch = next_batch
+
+    index.close()
+    print(scheduler.report())
+    if value_filter is not None:
+        print(value_filter.report())
+    if history is not None:
+        history.close()
+        print(history.report())
 
 
 if __name__ == "__main__":
-    IOT_TOPIC = "A08_PR_NVD_01"
     omni.client.initialize()
-    omni.client.set_log_level(omni.client.LogLevel.DEBUG)
-    omni.client.set_log_callback(log_handler)
+    log_buffer.install(LOG_LEVEL)
+    exporter = MetricsExporter(registry, METRICS_PORT, METRICS_FILE or None).start()
     try:
-        stage, live_layer = asyncio.run(initialize_async(IOT_TOPIC))
-        run(stage, live_layer, IOT_TOPIC)
+        topics = find_topics(IOT_TOPICS)
+        # the stage and .live layer of the first topic receive the data of all the devices
+        IOT_TOPIC = topics[0]
+        # columnar data is memory mapped, so it is never streamed
+        streamed = CHUNK_SIZE > 0 and not any(is_columnar(topic) for topic in topics)
+        if len(topics) > 1:
+            # merge the timelines of all the devices, each tick is written as one change
+            if streamed:
+                # every file is streamed and the streams are merged on the fly
+                devices = {topic: streamed_schema(topic) for topic in topics}
+                merged = MergedStream(
+                    {
+                        topic: (
+                            schema_names(schema),
+                            stream_batches(topic_data_path(topic), schema_names(schema), "0", CHUNK_SIZE),
+                        )
+                        for topic, schema in devices.items()
+                    }
+                )
+            else:
+                plans = {topic: load_plan(topic_data_path(topic), USE_CACHE) for topic in topics}
+                devices = {topic: plan_schema(topic, plan) for topic, plan in plans.items()}
+                merged = merge_plans(plans)
+            attr_paths = [f"/iot/{attr_name}" for attr_name in merged.attr_names]
+            ts_path = None
+            batches = merged.batches(REPLAY_SEEK)
+        else:
+            if streamed:
+                # stream large files, rows with Ids that are not in the schema are skipped
+                schema = streamed_schema(IOT_TOPIC)
+                attr_names = schema_names(schema)
+                batches = stream_batches(topic_data_path(IOT_TOPIC), attr_names, REPLAY_SEEK, CHUNK_SIZE)
+            else:
+                # parse the CSV a single time, it is shared by the prim setup and the playback
+                plan = load_plan(topic_data_path(IOT_TOPIC), USE_CACHE)
+                attr_names = plan.attr_names
+                schema = plan_schema(IOT_TOPIC, plan)
+                batches = plan.batches(REPLAY_SEEK)
+            devices = {IOT_TOPIC: schema}
+            attr_paths = [f"/iot/{IOT_TOPIC}.{attr_name}" for attr_name in attr_names]
+            ts_path = f"/iot/{IOT_TOPIC}._ts"
+
+        stage, live_layer = asyncio.run(initialize_async(IOT_TOPIC, devices))
+        schemas = {f"/iot/{topic}": schema for topic, schema in devices.items()}
+        run(
+            stage,
+            live_layer,
+            attr_paths,
+            schemas,
+            ts_path,
+            batches,
+            REPLAY_SPEED,
+            FLUSH_RATE,
+            create_history(IOT_TOPIC),
+            create_filter(attr_paths, schemas),
+        )
     except:
-        print('---- LOG MESSAGES ---')
-        print(*messages, sep='\n')
-        print('----')
+        log_buffer.dump()
     finally:
+        exporter.stop()
         omni.client.shutdown()
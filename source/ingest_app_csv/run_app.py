@@ -25,6 +25,30 @@ parser.add_argument("--username", "-u")
 parser.add_argument("--password", "-p")
 parser.add_argument("--config", "-c", choices=["debug", "release"], default="release")
 parser.add_argument("--platform", default=CURRENT_PLATFORM)
+parser.add_argument(
+    "--log-level", default="warning", choices=["debug", "verbose", "info", "warning", "error"], help="client log level"
+)
+parser.add_argument("--log-capacity", default="1000", help="client log messages kept for a dump on failure or SIGUSR1")
+parser.add_argument("--metrics-port", default="0", help="serve metrics on http://127.0.0.1:<port>/metrics, 0 is off")
+parser.add_argument("--metrics-file", default="", help="write the metrics as JSON to this file every 10 seconds")
+parser.add_argument("--no-cache", action="store_true", help="always parse the CSV instead of using the cached copy")
+parser.add_argument("--topics", default="A08_PR_NVD_01", help="comma separated topics or glob patterns to ingest")
+parser.add_argument("--speed", default="1", help="replay speed multiplier, or 'max' to replay as fast as possible")
+parser.add_argument("--seek", default="0", help="skip to seconds from the start of the data, or to a timestamp")
+parser.add_argument("--flush-rate", default="0", help="maximum live layer flushes per second, 0 flushes every update")
+parser.add_argument(
+    "--chunk-size", default="0", help="stream the CSV in chunks of this many rows, 0 loads the whole file"
+)
+parser.add_argument(
+    "--schema-sample", default="0", help="infer a streamed device's attributes from this many rows, 0 reads every Id"
+)
+parser.add_argument("--history-rate", default="0", help="history samples per second of data time, 0 is off")
+parser.add_argument("--history-samples", default="3600", help="history samples kept per attribute, 0 keeps all")
+parser.add_argument("--history-age", default="0", help="seconds of data time kept in the history layer, 0 keeps all")
+parser.add_argument("--filter", dest="value_filter", action="store_true", help="only write values that changed")
+parser.add_argument("--deadband", default="0", help="absolute change a value needs to be written")
+parser.add_argument("--relative-deadband", default="0", help="change relative to the last value needed to be written")
+parser.add_argument("--heartbeat", default="60", help="seconds after which an unchanged value is written again")
 args = parser.parse_args()
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -42,6 +66,7 @@ EXTRA_PYTHON_PATHS = [
     str(USD_LIB_DIR.joinpath("python")),
     str(CLIENT_LIB_DIR.joinpath("bindings-python")),
     str(BUILD_DIR.joinpath("bindings-python")),
+    str(ROOT_DIR.joinpath("source")),
 ]
 
 if PLATFORM_SYSTEM == "windows":
@@ -58,6 +83,24 @@ os.environ["PYTHONPATH"] = os.pathsep + os.pathsep.join(EXTRA_PYTHON_PATHS)
 os.environ["OMNI_USER"] = args.username
 os.environ["OMNI_PASS"] = args.password
 os.environ["OMNI_HOST"] = args.server
+os.environ["IOT_LOG_LEVEL"] = args.log_level
+os.environ["IOT_LOG_CAPACITY"] = args.log_capacity
+os.environ["IOT_METRICS_PORT"] = args.metrics_port
+os.environ["IOT_METRICS_FILE"] = args.metrics_file
+os.environ["IOT_DATA_CACHE"] = "0" if args.no_cache else "1"
+os.environ["IOT_TOPICS"] = args.topics
+os.environ["IOT_REPLAY_SPEED"] = args.speed
+os.environ["IOT_REPLAY_SEEK"] = args.seek
+os.environ["IOT_FLUSH_RATE"] = args.flush_rate
+os.environ["IOT_CHUNK_SIZE"] = args.chunk_size
+os.environ["IOT_SCHEMA_SAMPLE"] = args.schema_sample
+os.environ["IOT_HISTORY_RATE"] = args.history_rate
+os.environ["IOT_HISTORY_SAMPLES"] = args.history_samples
+os.environ["IOT_HISTORY_AGE"] = args.history_age
+os.environ["IOT_FILTER"] = "1" if args.value_filter else "0"
+os.environ["IOT_DEADBAND"] = args.deadband
+os.environ["IOT_RELATIVE_DEADBAND"] = args.relative_deadband
+os.environ["IOT_HEARTBEAT"] = args.heartbeat
 
 if PLATFORM_SYSTEM == "windows":
     PYTHON_EXE = DEPS_DIR.joinpath("python", "python")
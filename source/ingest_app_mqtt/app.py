@@ -27,26 +27,83 @@ import os
 import omni.client
 from pxr import Usd, Sdf
 from pathlib import Path
-import pandas as pd
 import time
 from paho.mqtt import client as mqtt_client
 import random
-import json
+import numpy as np
+from iot_common.aio_mqtt import LocalBroker, MqttClient
+from iot_common.attributes import AttributeIndex, ValueWriter
+from iot_common.cache import load_plan
+from iot_common.codec import PayloadDecoder, encode_json, encode_packed, encode_schema, schema_id, schema_topic
+from iot_common.filters import DeadbandFilter
+from iot_common.history import HistoryRecorder
+from iot_common.logs import LogBuffer
+from iot_common.metrics import MetricsExporter, registry
+from iot_common.schema import (
+    Attribute,
+    device_schema,
+    extend_schema,
+    reconcile_attributes,
+    schema_names,
+)
+from iot_common.writer import CoalescingWriter
 
 OMNI_HOST = os.environ.get("OMNI_HOST", "localhost")
 BASE_URL = "omniverse://" + OMNI_HOST + "/Projects/IoT/Samples/HeadlessApp"
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 CONTENT_DIR = Path(SCRIPT_DIR).resolve().parents[1].joinpath("content")
 
-messages = []
-
-
-def log_handler(thread, component, level, message):
-    # print(message)
-    messages.append((thread, component, level, message))
-
-
-def initialize_device_prim(live_layer, iot_topic):
+# keep a parsed copy of the CSV next to it to speed up later starts
+USE_CACHE = os.environ.get("IOT_DATA_CACHE", "1") == "1"
+# received values are coalesced over this many milliseconds and written as a single change
+WRITE_WINDOW = float(os.environ.get("IOT_WRITE_WINDOW", "20")) / 1000.0
+# maximum number of received messages waiting to be written, the oldest are dropped beyond it
+QUEUE_SIZE = int(os.environ.get("IOT_QUEUE_SIZE", "10000"))
+# host:port of the mqtt broker
+MQTT_BROKER = os.environ.get("IOT_MQTT_BROKER", "test.mosquitto.org:1883")
+# run an in-process stand-in broker on 127.0.0.1 instead of connecting to MQTT_BROKER
+LOCAL_BROKER = os.environ.get("IOT_LOCAL_BROKER", "0") == "1"
+# run the subscriber, decoder and writer as asyncio tasks instead of paho threads
+ASYNC_PIPELINE = os.environ.get("IOT_ASYNC", "0") == "1"
+# "json" or "packed", the packed format sends a schema message and indexed float64 values
+PAYLOAD_FORMAT = os.environ.get("IOT_PAYLOAD_FORMAT", "json")
+# seconds between repeats of the schema message for subscribers that join late
+SCHEMA_INTERVAL = 10.0
+# stamp each message with the wall-clock time it was published as _origin, and the time its values were
+# written to the .live layer as _written, so the latency of each hop can be measured down to the panel
+TRACE = os.environ.get("IOT_TRACE", "0") == "1"
+# the attributes of the header of each message, before the values of the device
+HEADER_NAMES = ["_ts", "_origin"] if TRACE else ["_ts"]
+TRACE_NAMES = ["_origin", "_written"] if TRACE else []
+# record the written values as time samples on <topic>.history.usda at this many samples per second of
+# data time, 0 turns recording off
+HISTORY_RATE = float(os.environ.get("IOT_HISTORY_RATE", "0"))
+# samples kept per attribute in the history layer, 0 keeps all
+HISTORY_SAMPLES = int(os.environ.get("IOT_HISTORY_SAMPLES", "3600"))
+# seconds of data time kept in the history layer, 0 keeps all
+HISTORY_AGE = float(os.environ.get("IOT_HISTORY_AGE", "0"))
+# seconds between saves of the history layer
+HISTORY_SAVE_INTERVAL = 30.0
+# only write the values that changed by more than a deadband, see DeadbandFilter
+VALUE_FILTER = os.environ.get("IOT_FILTER", "0") == "1"
+# absolute and relative deadbands of the filter, attributes of a schema manifest may override them
+DEADBAND = float(os.environ.get("IOT_DEADBAND", "0"))
+RELATIVE_DEADBAND = float(os.environ.get("IOT_RELATIVE_DEADBAND", "0"))
+# seconds of data time after which a filtered value is written even if it did not change
+HEARTBEAT = float(os.environ.get("IOT_HEARTBEAT", "60"))
+
+# log messages of the client library kept for a dump on failure or SIGUSR1, and the lowest level kept
+LOG_CAPACITY = int(os.environ.get("IOT_LOG_CAPACITY", "1000"))
+LOG_LEVEL = os.environ.get("IOT_LOG_LEVEL", "WARNING")
+# serve the metrics on http://127.0.0.1:<port>/metrics, 0 turns the endpoint off
+METRICS_PORT = int(os.environ.get("IOT_METRICS_PORT", "0"))
+# write the metrics as JSON to this file every 10 seconds
+METRICS_FILE = os.environ.get("IOT_METRICS_FILE", "")
+
+log_buffer = LogBuffer(LOG_CAPACITY)
+
+
+def initialize_device_prim(live_layer, iot_topic, schema):
     iot_root = live_layer.GetPrimAtPath("/iot")
     iot_spec = live_layer.GetPrimAtPath(f"/iot/{iot_topic}")
     if not iot_spec:
@@ -54,26 +111,11 @@ def initialize_device_prim(live_layer, iot_topic):
     if not iot_spec:
         raise Exception("Failed to create the IoT Spec.")
 
-    # clear out any attrubutes that may be on the spec
-    for attrib in iot_spec.attributes:
-        iot_spec.RemoveProperty(attrib)
-
-    IOT_TOPIC_DATA = f"{CONTENT_DIR}/{iot_topic}_iot_data.csv"
-    data = pd.read_csv(IOT_TOPIC_DATA)
-    data.head()
-
-    # create all the IoT attributes that will be written
-    attr = Sdf.AttributeSpec(iot_spec, "_ts", Sdf.ValueTypeNames.Double)
-    if not attr:
-        raise Exception(f"Could not define the attribute: {attrName}")
-
-    # infer the unique data points in the CSV.
-    # The values may be known in advance and can be hard coded
-    grouped = data.groupby("Id")
-    for attrName, group in grouped:
-        attr = Sdf.AttributeSpec(iot_spec, attrName, Sdf.ValueTypeNames.Double)
-        if not attr:
-            raise Exception(f"Could not define the attribute: {attrName}")
+    # create the IoT attributes that will be written, the attributes that already exist are kept.
+    # The schema comes from the device manifest or was inferred from the data
+    reconcile_attributes(
+        iot_spec, [Attribute(attr_name, "double", None) for attr_name in ["_ts"] + TRACE_NAMES] + schema
+    )
 
 
 def create_live_layer(iot_topic):
@@ -88,7 +130,7 @@ def create_live_layer(iot_topic):
     return live_layer
 
 
-async def initialize_async(iot_topic):
+async def initialize_async(iot_topic, attributes):
     # copy a the Conveyor Belt to the target nucleus server
     LOCAL_URL = f"file:{CONTENT_DIR}/ConveyorBelt_{iot_topic}.usd"
     STAGE_URL = f"{BASE_URL}/ConveyorBelt_{iot_topic}.usd"
@@ -119,52 +161,119 @@ async def initialize_async(iot_topic):
         root_layer.subLayerPaths.append(live_layer.identifier)
         root_layer.Save()
 
-    initialize_device_prim(live_layer, iot_topic)
+    initialize_device_prim(live_layer, iot_topic, attributes)
 
     # set the live layer as the edit target
     stage.SetEditTarget(live_layer)
     return stage, live_layer
 
 
-def write_to_live(live_layer, iot_topic, msg_content):
-    # write the iot values to the usd prim attributes
-    payload = json.loads(msg_content)
-    with Sdf.ChangeBlock():
-        for i, (id, value) in enumerate(payload.items()):
-            attr = live_layer.GetAttributeAtPath(f"/iot/{iot_topic}.{id}")
-            if not attr:
-                raise Exception(f"Could not find attribute /iot/{iot_topic}.{id}.")
-            attr.default = value
+def create_history(iot_topic):
+    # the history layer is saved next to the stage, it is not a sublayer of the stage because the
+    # defaults of the .live layer would hide its time samples
+    if HISTORY_RATE <= 0:
+        return None
+    return HistoryRecorder(
+        f"{BASE_URL}/{iot_topic}.history.usda", HISTORY_RATE, HISTORY_SAMPLES, HISTORY_AGE, HISTORY_SAVE_INTERVAL
+    )
+
+
+def create_filter(attr_paths, schemas):
+    if not VALUE_FILTER:
+        return None
+    return DeadbandFilter(attr_paths, schemas, DEADBAND, RELATIVE_DEADBAND, HEARTBEAT)
+
+
+def device_writer(index, iot_topic, attributes, history=None):
+    # writes _ts and the Ids of the device to their typed attributes
+    prim_path = f"/iot/{iot_topic}"
+    attr_paths = [f"{prim_path}.{attr_name}" for attr_name in ["_ts"] + TRACE_NAMES + schema_names(attributes)]
+    schemas = {prim_path: attributes}
+    return ValueWriter(index, attr_paths, schemas, history, create_filter(attr_paths, schemas))
+
+
+def write_to_live(index, values_writer, iot_topic, values):
+    # write the latest iot values received in a window to the usd prim attributes
+    positions = values_writer.positions(f"/iot/{iot_topic}")
+    attr_positions = []
+    for id in values:
+        position = positions.get(id)
+        if position is None:
+            raise Exception(f"Could not find attribute /iot/{iot_topic}.{id}.")
+        attr_positions.append(position)
+    if TRACE and "_origin" in values:
+        # _origin is the publish time of the latest message of the window
+        written = time.time()
+        values["_written"] = written
+        attr_positions.append(positions["_written"])
+        registry.observe("publish_latency", written - values["_origin"])
+    start = time.perf_counter()
+    with index.writing(), Sdf.ChangeBlock():
+        # _ts is the data time of the values, for the history layer
+        values_writer.write(attr_positions, values.values(), values.get("_ts"))
+    applied = time.perf_counter()
     omni.client.live_process()
+    registry.add_time("apply", applied - start)
+    registry.add_time("live_process", time.perf_counter() - applied)
+
+
+def payload_schema(attr_names):
+    # the header attributes are the first of the schema, the plan's attributes follow them
+    if PAYLOAD_FORMAT == "packed":
+        return HEADER_NAMES + list(attr_names)
+    return None
+
+
+def encode_payload(attr_names, batch, schema=None):
+    header = [float(batch.ts), time.time()] if TRACE else [float(batch.ts)]
+    if schema is not None:
+        return encode_packed(
+            schema_id(schema),
+            np.append(np.arange(len(header)), batch.attr_indices + len(header)),
+            np.append(header, batch.values),
+        )
+    payload = dict(zip(HEADER_NAMES, header))
+    for attr_index, value in zip(batch.attr_indices.tolist(), batch.values.tolist()):
+        payload[attr_names[attr_index]] = value
+    return encode_json(payload)
 
 
 # publish to mqtt broker
-def write_to_mqtt(mqtt_client, iot_topic, group, ts):
+def write_to_mqtt(mqtt_client, iot_topic, attr_names, batch, schema=None):
     # write the iot values to the usd prim attributes
     topic = f"iot/{iot_topic}"
-    print(group.iloc[0]["TimeStamp"])
-    payload = {"_ts": ts}
-    for index, row in group.iterrows():
-        payload[row["Id"]] = row["Value"]
-    mqtt_client.publish(topic, json.dumps(payload, indent=2).encode("utf-8"))
+    print(batch.time)
+    payload = encode_payload(attr_names, batch, schema)
+    mqtt_client.publish(topic, payload)
+    registry.count("messages_published")
+    registry.count("bytes_published", len(payload))
+
+
+def broker_address():
+    host, _, port = MQTT_BROKER.rpartition(":")
+    return host, int(port)
 
 
 # connect to mqtt broker
-def connect_mqtt(iot_topic):
+def connect_mqtt(iot_topic, writer, decoder, host, port):
     topic = f"iot/{iot_topic}"
 
-    # called when a message arrives
+    # called when a message arrives, it is decoded and written by the writer thread
     def on_message(client, userdata, msg):
-        msg_content = msg.payload.decode()
-        write_to_live(live_layer, iot_topic, msg_content)
-        print(f"Received `{msg_content}` from `{msg.topic}` topic")
+        if msg.topic == schema_topic(topic):
+            try:
+                decoder.on_schema(msg.payload)
+            except Exception as e:
+                print(f"Could not decode schema: {e}")
+        else:
+            writer.submit(msg.payload)
 
     # called when connection to mqtt broker has been established
     def on_connect(client, userdata, flags, rc):
         if rc == 0:
-            # connect to our topic
+            # connect to our topic and to the schema of its payloads
             print(f"Subscribing to topic: {topic}")
-            client.subscribe(topic)
+            client.subscribe([(topic, 0), (schema_topic(topic), 0)])
         else:
             print(f"Failed to connect, return code {rc}")
 
@@ -178,50 +287,191 @@ def connect_mqtt(iot_topic):
     client.on_connect = on_connect
     client.on_message = on_message
     client.on_subscribe = on_subscribe
-    client.connect("test.mosquitto.org", 1883)
+    client.connect(host, port)
     client.loop_start()
     return client
 
 
-def run(stage, live_layer, iot_topic):
+def run(stage, live_layer, iot_topic, plan, attributes):
     # we assume that the file contains the data for single device
-    IOT_TOPIC_DATA = f"{CONTENT_DIR}/{iot_topic}_iot_data.csv"
-    data = pd.read_csv(IOT_TOPIC_DATA)
-    data.head()
-
-    # Converting to DateTime Format and drop ms
-    data["TimeStamp"] = pd.to_datetime(data["TimeStamp"])
-    data["TimeStamp"] = data["TimeStamp"].dt.floor("s")
-
-    data.set_index("TimeStamp")
-    start_time = data.min()["TimeStamp"]
-    last_time = start_time
-    grouped = data.groupby("TimeStamp")
-
-    mqtt_client = connect_mqtt(iot_topic)
+    decoder = PayloadDecoder()
+    index = AttributeIndex(live_layer)
+    history = create_history(iot_topic)
+    values_writer = device_writer(index, iot_topic, attributes, history)
+    writer = CoalescingWriter(
+        decoder.decode,
+        lambda values: write_to_live(index, values_writer, iot_topic, values),
+        WRITE_WINDOW,
+        QUEUE_SIZE,
+    )
+    writer.start()
+    host, port = broker_address()
+    if LOCAL_BROKER:
+        host = "127.0.0.1"
+        port = LocalBroker().serve_in_thread(host, port)
+    mqtt_client = connect_mqtt(iot_topic, writer, decoder, host, port)
 
     # play back the data in real-time
-    for next_time, group in grouped:
-        diff = (next_time - last_time).total_seconds()
+    schema = payload_schema(plan.attr_names)
+    last_schema = None
+    last_ts = 0.0
+    for batch in plan.batches():
+        diff = batch.ts - last_ts
         if diff > 0:
             time.sleep(diff)
-            write_to_mqtt(mqtt_client, iot_topic, group, (next_time - start_time).total_seconds())
-        last_time = next_time
+        if schema is not None and (last_schema is None or time.monotonic() - last_schema >= SCHEMA_INTERVAL):
+            mqtt_client.publish(schema_topic(f"iot/{iot_topic}"), encode_schema(schema), retain=True)
+            last_schema = time.monotonic()
+        write_to_mqtt(mqtt_client, iot_topic, plan.attr_names, batch, schema)
+        last_ts = batch.ts
 
     mqtt_client = None
+    writer.stop()
+    index.close()
+    print(writer.report())
+    if values_writer.value_filter is not None:
+        print(values_writer.value_filter.report())
+    if history is not None:
+        history.close()
+        print(history.report())
+
+
+async def publish_async(client, iot_topic, plan):
+    topic = f"iot/{iot_topic}"
+
+    # play back the data in real-time
+    schema = payload_schema(plan.attr_names)
+    last_schema = None
+    last_ts = 0.0
+    for batch in plan.batches():
+        diff = batch.ts - last_ts
+        if diff > 0:
+            await asyncio.sleep(diff)
+        if schema is not None and (last_schema is None or time.monotonic() - last_schema >= SCHEMA_INTERVAL):
+            await client.publish(schema_topic(topic), encode_schema(schema), retain=True)
+            last_schema = time.monotonic()
+        print(batch.time)
+        payload = encode_payload(plan.attr_names, batch, schema)
+        await client.publish(topic, payload)
+        registry.count("messages_published")
+        registry.count("bytes_published", len(payload))
+        last_ts = batch.ts
+
+
+async def subscribe_async(client, iot_topic, decoder, raw_queue, activity):
+    # the socket is only read while raw_queue has room
+    loop = asyncio.get_running_loop()
+    async for topic, payload in client.messages():
+        if topic == schema_topic(f"iot/{iot_topic}"):
+            try:
+                decoder.on_schema(payload)
+            except Exception as e:
+                print(f"Could not decode schema: {e}")
+        else:
+            registry.count("messages_received")
+            await raw_queue.put((time.monotonic(), payload))
+        activity["last"] = loop.time()
+
+
+async def decode_async(decoder, raw_queue, values_queue):
+    while True:
+        item = await raw_queue.get()
+        if item is None:
+            await values_queue.put(None)
+            return
+        received_at, payload = item
+        start = time.perf_counter()
+        try:
+            values = decoder.decode(payload)
+        except Exception as e:
+            registry.count("decode_errors")
+            print(f"Could not decode message: {e}")
+            continue
+        registry.add_time("parse", time.perf_counter() - start)
+        await values_queue.put((received_at, values))
+
+
+async def run_async(iot_topic, plan, attributes):
+    # the stage setup, the publisher and the subscriber -> decoder -> writer pipeline all run on one
+    # event loop. The stages are joined by bounded queues, so a slow writer stops the decoder, which
+    # stops the subscriber reading from the socket
+    loop = asyncio.get_running_loop()
+    stage, live_layer = await initialize_async(iot_topic, attributes)
+
+    host, port = broker_address()
+    broker = None
+    client = None
+    subscriber = None
+    stages = None
+    index = AttributeIndex(live_layer)
+    history = create_history(iot_topic)
+    values_writer = device_writer(index, iot_topic, attributes, history)
+    writer = CoalescingWriter(
+        None, lambda values: write_to_live(index, values_writer, iot_topic, values), WRITE_WINDOW, QUEUE_SIZE
+    )
+    # the client, the broker and the stages are shut down even when one of them fails
+    try:
+        if LOCAL_BROKER:
+            host = "127.0.0.1"
+            broker = LocalBroker()
+            port = await broker.start(host, port)
+
+        client = MqttClient(f"python-mqtt-{random.randint(0, 1000)}")
+        await client.connect(host, port)
+        await client.subscribe(f"iot/{iot_topic}")
+        await client.subscribe(schema_topic(f"iot/{iot_topic}"))
+
+        raw_queue = asyncio.Queue(QUEUE_SIZE)
+        values_queue = asyncio.Queue(QUEUE_SIZE)
+        activity = {"last": loop.time()}
+        decoder = PayloadDecoder()
+        subscriber = asyncio.ensure_future(subscribe_async(client, iot_topic, decoder, raw_queue, activity))
+        stages = asyncio.gather(decode_async(decoder, raw_queue, values_queue), writer.run_async(values_queue))
+
+        await publish_async(client, iot_topic, plan)
+
+        # stop once nothing has been received for a second and let the stages drain
+        while loop.time() - activity["last"] < 1.0:
+            await asyncio.sleep(0.1)
+        subscriber.cancel()
+        await raw_queue.put(None)
+        await stages
+    finally:
+        if subscriber is not None:
+            subscriber.cancel()
+        if stages is not None and not stages.done():
+            stages.cancel()
+            await asyncio.gather(stages, return_exceptions=True)
+        if client is not None:
+            await client.disconnect()
+        if broker is not None:
+            await broker.close()
+        index.close()
+        print(writer.report())
+        if values_writer.value_filter is not None:
+            print(values_writer.value_filter.report())
+        if history is not None:
+            history.close()
+            print(history.report())
 
 
 if __name__ == "__main__":
     IOT_TOPIC = "A08_PR_NVD_01"
     omni.client.initialize()
-    omni.client.set_log_level(omni.client.LogLevel.DEBUG)
-    omni.client.set_log_callback(log_handler)
+    log_buffer.install(LOG_LEVEL)
+    exporter = MetricsExporter(registry, METRICS_PORT, METRICS_FILE or None).start()
     try:
-        stage, live_layer = asyncio.run(initialize_async(IOT_TOPIC))
-        run(stage, live_layer, IOT_TOPIC)
+        # parse the CSV a single time, it is shared by the prim setup and the publisher
+        plan = load_plan(f"{CONTENT_DIR}/{IOT_TOPIC}_iot_data.csv", USE_CACHE)
+        # the attributes declared in content/<topic>_schema.json, the other Ids of the data are doubles
+        attributes = extend_schema(device_schema(f"{CONTENT_DIR}/{IOT_TOPIC}_schema.json"), plan.attr_names)
+        if ASYNC_PIPELINE:
+            asyncio.run(run_async(IOT_TOPIC, plan, attributes))
+        else:
+            stage, live_layer = asyncio.run(initialize_async(IOT_TOPIC, attributes))
+            run(stage, live_layer, IOT_TOPIC, plan, attributes)
     except:
-        print('---- LOG MESSAGES ---')
-        print(*messages, sep='\n')
-        print('----')
+        log_buffer.dump()
     finally:
+        exporter.stop()
         omni.client.shutdown()
@@ -25,6 +25,27 @@ parser.add_argument("--username", "-u")
 parser.add_argument("--password", "-p")
 parser.add_argument("--config", "-c", choices=["debug", "release"], default="release")
 parser.add_argument("--platform", default=CURRENT_PLATFORM)
+parser.add_argument(
+    "--log-level", default="warning", choices=["debug", "verbose", "info", "warning", "error"], help="client log level"
+)
+parser.add_argument("--log-capacity", default="1000", help="client log messages kept for a dump on failure or SIGUSR1")
+parser.add_argument("--metrics-port", default="0", help="serve metrics on http://127.0.0.1:<port>/metrics, 0 is off")
+parser.add_argument("--metrics-file", default="", help="write the metrics as JSON to this file every 10 seconds")
+parser.add_argument("--broker", default="test.mosquitto.org:1883", help="host:port of the mqtt broker")
+parser.add_argument("--local-broker", action="store_true", help="run an in-process stand-in mqtt broker")
+parser.add_argument("--async", dest="use_async", action="store_true", help="run the ingest pipeline on asyncio")
+parser.add_argument("--payload-format", choices=["json", "packed"], default="json", help="mqtt payload encoding")
+parser.add_argument("--trace", action="store_true", help="stamp messages with their publish and write times")
+parser.add_argument("--write-window", default="20", help="milliseconds over which received values are coalesced")
+parser.add_argument("--queue-size", default="10000", help="maximum number of received messages waiting to be written")
+parser.add_argument("--no-cache", action="store_true", help="always parse the CSV instead of using the cached copy")
+parser.add_argument("--history-rate", default="0", help="history samples per second of data time, 0 is off")
+parser.add_argument("--history-samples", default="3600", help="history samples kept per attribute, 0 keeps all")
+parser.add_argument("--history-age", default="0", help="seconds of data time kept in the history layer, 0 keeps all")
+parser.add_argument("--filter", dest="value_filter", action="store_true", help="only write values that changed")
+parser.add_argument("--deadband", default="0", help="absolute change a value needs to be written")
+parser.add_argument("--relative-deadband", default="0", help="change relative to the last value needed to be written")
+parser.add_argument("--heartbeat", default="60", help="seconds after which an unchanged value is written again")
 args = parser.parse_args()
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -42,6 +63,7 @@ EXTRA_PYTHON_PATHS = [
     str(USD_LIB_DIR.joinpath("python")),
     str(CLIENT_LIB_DIR.joinpath("bindings-python")),
     str(BUILD_DIR.joinpath("bindings-python")),
+    str(ROOT_DIR.joinpath("source")),
 ]
 
 if PLATFORM_SYSTEM == "windows":
@@ -58,6 +80,25 @@ os.environ["PYTHONPATH"] = os.pathsep + os.pathsep.join(EXTRA_PYTHON_PATHS)
 os.environ["OMNI_USER"] = args.username
 os.environ["OMNI_PASS"] = args.password
 os.environ["OMNI_HOST"] = args.server
+os.environ["IOT_LOG_LEVEL"] = args.log_level
+os.environ["IOT_LOG_CAPACITY"] = args.log_capacity
+os.environ["IOT_METRICS_PORT"] = args.metrics_port
+os.environ["IOT_METRICS_FILE"] = args.metrics_file
+os.environ["IOT_MQTT_BROKER"] = args.broker
+os.environ["IOT_LOCAL_BROKER"] = "1" if args.local_broker else "0"
+os.environ["IOT_ASYNC"] = "1" if args.use_async else "0"
+os.environ["IOT_PAYLOAD_FORMAT"] = args.payload_format
+os.environ["IOT_TRACE"] = "1" if args.trace else "0"
+os.environ["IOT_WRITE_WINDOW"] = args.write_window
+os.environ["IOT_QUEUE_SIZE"] = args.queue_size
+os.environ["IOT_DATA_CACHE"] = "0" if args.no_cache else "1"
+os.environ["IOT_HISTORY_RATE"] = args.history_rate
+os.environ["IOT_HISTORY_SAMPLES"] = args.history_samples
+os.environ["IOT_HISTORY_AGE"] = args.history_age
+os.environ["IOT_FILTER"] = "1" if args.value_filter else "0"
+os.environ["IOT_DEADBAND"] = args.deadband
+os.environ["IOT_RELATIVE_DEADBAND"] = args.relative_deadband
+os.environ["IOT_HEARTBEAT"] = args.heartbeat
 
 if PLATFORM_SYSTEM == "windows":
     PYTHON_EXE = DEPS_DIR.joinpath("python", "python")
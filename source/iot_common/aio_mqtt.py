@@ -0,0 +1,315 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# A minimal asyncio implementation of MQTT 3.1.1 for the ingest pipeline. MqttClient publishes and
+# subscribes at QoS 0, and a slow consumer of messages() stops reading from the socket, so
+# backpressure reaches the broker through TCP. LocalBroker is a stand-in broker for local runs and
+# benchmarks: QoS 0 delivery and retained messages only, no wills or persistent sessions. Malformed
+# packets raise ValueError.
+
+import asyncio
+import itertools
+import struct
+import threading
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+# the remaining length of a packet is encoded in at most 4 bytes
+MAX_LENGTH_BYTES = 4
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length > 0:
+            byte |= 0x80
+        encoded.append(byte)
+        if length == 0:
+            return bytes(encoded)
+
+
+def _string(value):
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return struct.pack("!H", len(value)) + value
+
+
+def _packet(packet_type, flags, body):
+    return bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body
+
+
+async def read_packet(reader):
+    header = await reader.readexactly(1)
+    length = 0
+    for position in range(MAX_LENGTH_BYTES):
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) << (7 * position)
+        if byte & 0x80 == 0:
+            break
+    else:
+        raise ValueError(f"Malformed remaining length, more than {MAX_LENGTH_BYTES} bytes")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return header[0] >> 4, header[0] & 0x0F, body
+
+
+def encode_publish(topic, payload, retain=False):
+    return _packet(PUBLISH, 0x01 if retain else 0, _string(topic) + payload)
+
+
+def decode_publish(flags, body):
+    # returns the topic, payload and the packet id, which is None for QoS 0
+    if len(body) < 2:
+        raise ValueError("Malformed PUBLISH packet, no topic")
+    (topic_length,) = struct.unpack_from("!H", body)
+    position = 2 + topic_length
+    packet_id = None
+    if (flags >> 1) & 0x03 > 0:
+        if len(body) < position + 2:
+            raise ValueError("Malformed PUBLISH packet, no packet id")
+        (packet_id,) = struct.unpack_from("!H", body, position)
+    elif len(body) < position:
+        raise ValueError("Malformed PUBLISH packet, the topic is longer than the packet")
+    # a topic that is not UTF-8 raises UnicodeDecodeError, which is a ValueError
+    topic = body[2 : 2 + topic_length].decode("utf-8")
+    if packet_id is not None:
+        position += 2
+    return topic, body[position:], packet_id
+
+
+def topic_matches(topic_filter, topic):
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[index]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class MqttClient:
+    def __init__(self, client_id, keepalive=60):
+        self._client_id = client_id
+        self._keepalive = keepalive
+        self._packet_ids = itertools.count(1)
+        self._reader = None
+        self._writer = None
+        self._ping_task = None
+
+    async def connect(self, host, port=1883, username=None, password=None):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        flags = 0x02
+        payload = _string(self._client_id)
+        if username:
+            flags |= 0x80
+            payload += _string(username)
+            if password:
+                flags |= 0x40
+                payload += _string(password)
+        header = _string("MQTT") + bytes([4, flags]) + struct.pack("!H", self._keepalive)
+        self._writer.write(_packet(CONNECT, 0, header + payload))
+        await self._writer.drain()
+
+        packet_type, _, body = await read_packet(self._reader)
+        if packet_type != CONNACK or body[1] != 0:
+            raise Exception(f"Failed to connect to {host}:{port}, return code {body[1] if len(body) > 1 else None}")
+        self._ping_task = asyncio.ensure_future(self._ping())
+
+    async def _ping(self):
+        while True:
+            await asyncio.sleep(self._keepalive / 2)
+            self._writer.write(_packet(PINGREQ, 0, b""))
+            await self._writer.drain()
+
+    async def subscribe(self, topic_filter):
+        packet_id = next(self._packet_ids) % 0x10000 or 1
+        self._writer.write(_packet(SUBSCRIBE, 0x02, struct.pack("!H", packet_id) + _string(topic_filter) + b"\x00"))
+        await self._writer.drain()
+
+    async def unsubscribe(self, topic_filter):
+        packet_id = next(self._packet_ids) % 0x10000 or 1
+        self._writer.write(_packet(UNSUBSCRIBE, 0x02, struct.pack("!H", packet_id) + _string(topic_filter)))
+        await self._writer.drain()
+
+    async def publish(self, topic, payload, retain=False):
+        # drain waits while the socket buffer is full
+        self._writer.write(encode_publish(topic, payload, retain))
+        await self._writer.drain()
+
+    async def messages(self):
+        # yields (topic, payload) tuples, the socket is only read while the caller asks for more. Ends
+        # when the connection is closed or reset, or when the stream can not be read any further
+        while True:
+            try:
+                packet_type, flags, body = await read_packet(self._reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except ValueError as e:
+                print(f"Closing the connection to the broker: {e}")
+                return
+            if packet_type == PUBLISH:
+                try:
+                    topic, payload, packet_id = decode_publish(flags, body)
+                except ValueError as e:
+                    print(f"Dropping a message: {e}")
+                    continue
+                if packet_id is not None:
+                    self._writer.write(_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                yield topic, payload
+
+    async def disconnect(self):
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+            self._ping_task = None
+        if self._writer is not None:
+            self._writer.write(_packet(DISCONNECT, 0, b""))
+            self._writer.close()
+            self._writer = None
+
+
+class LocalBroker:
+    # messages for a subscriber whose socket buffer holds more than max_buffer bytes are dropped
+    def __init__(self, max_buffer=16 * 1024 * 1024):
+        self._max_buffer = max_buffer
+        self._server = None
+        self._sessions = {}
+        self._handlers = set()
+        self._retained = {}
+        self.port = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # closing the connections ends the handlers, wait for them so none is left pending
+        for writer in list(self._sessions):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    def serve_in_thread(self, host="127.0.0.1", port=0):
+        # runs the broker on its own event loop for clients that are not asyncio based
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start(host, port))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="LocalBroker", daemon=True).start()
+        started.wait()
+        return self.port
+
+    def _route(self, topic, packet):
+        self.published += 1
+        for writer, topic_filters in self._sessions.items():
+            if any(topic_matches(topic_filter, topic) for topic_filter in topic_filters):
+                if writer.transport.get_write_buffer_size() > self._max_buffer:
+                    self.dropped += 1
+                    continue
+                writer.write(packet)
+                self.delivered += 1
+
+    async def _handle(self, reader, writer):
+        topic_filters = []
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            packet_type, _, _ = await read_packet(reader)
+            if packet_type != CONNECT:
+                return
+            writer.write(_packet(CONNACK, 0, b"\x00\x00"))
+            self._sessions[writer] = topic_filters
+
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                if packet_type == PUBLISH:
+                    topic, payload, packet_id = decode_publish(flags, body)
+                    if packet_id is not None:
+                        writer.write(_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                    if flags & 0x01:
+                        # a retained message is kept for future subscribers, an empty one clears it
+                        if len(payload) > 0:
+                            self._retained[topic] = encode_publish(topic, payload, True)
+                        else:
+                            self._retained.pop(topic, None)
+                    self._route(topic, encode_publish(topic, payload))
+                elif packet_type == SUBSCRIBE:
+                    position = 2
+                    granted = b""
+                    subscribed = []
+                    while position < len(body):
+                        (length,) = struct.unpack_from("!H", body, position)
+                        subscribed.append(body[position + 2 : position + 2 + length].decode("utf-8"))
+                        position += 3 + length
+                        granted += b"\x00"
+                    topic_filters.extend(subscribed)
+                    writer.write(_packet(SUBACK, 0, body[:2] + granted))
+                    for topic, packet in self._retained.items():
+                        if any(topic_matches(topic_filter, topic) for topic_filter in subscribed):
+                            writer.write(packet)
+                elif packet_type == UNSUBSCRIBE:
+                    position = 2
+                    while position < len(body):
+                        (length,) = struct.unpack_from("!H", body, position)
+                        topic_filter = body[position + 2 : position + 2 + length].decode("utf-8")
+                        if topic_filter in topic_filters:
+                            topic_filters.remove(topic_filter)
+                        position += 2 + length
+                    writer.write(_packet(UNSUBACK, 0, body[:2]))
+                elif packet_type == PINGREQ:
+                    writer.write(_packet(PINGRESP, 0, b""))
+                elif packet_type == DISCONNECT:
+                    return
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ValueError, struct.error) as e:
+            # a client that breaks the protocol is disconnected
+            print(f"Closing a broker connection: {e}")
+        finally:
+            self._sessions.pop(writer, None)
+            self._handlers.discard(handler)
+            writer.close()
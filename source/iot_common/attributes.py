@@ -0,0 +1,260 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import contextlib
+import time
+import numpy as np
+from pxr import Sdf, Tf
+from iot_common.metrics import registry
+from iot_common.schema import schema_bindings, value_cast, vector_cast
+
+
+class AttributeIndex:
+    # resolves the paths and attribute specs of a layer once, so writers do not parse a path and
+    # look up the spec for every value. The whole index is dropped when the layer is reloaded or its
+    # content replaced. Other changes to the layer, e.g. properties removed by another client, mark
+    # the index dirty and the next lookup or refresh() drops the specs that have expired. Changes made
+    # inside writing() are our own value writes and are ignored. generation changes whenever specs are
+    # dropped, callers that keep resolved lists should call refresh() and resolve them again when it does
+    def __init__(self, layer):
+        self._layer = layer
+        self._paths = {}
+        self._specs = {}
+        self._dirty = False
+        self._writing = False
+        self.generation = 0
+        self._listeners = [
+            Tf.Notice.Register(Sdf.Notice.LayersDidChangeSentPerLayer, self._on_layer_changed, layer),
+            Tf.Notice.Register(Sdf.Notice.LayerDidReloadContent, self._on_layer_reloaded, layer),
+            Tf.Notice.Register(Sdf.Notice.LayerDidReplaceContent, self._on_layer_reloaded, layer),
+        ]
+
+    def close(self):
+        for listener in self._listeners:
+            listener.Revoke()
+        self._listeners = []
+
+    @contextlib.contextmanager
+    def writing(self):
+        self._writing = True
+        try:
+            yield
+        finally:
+            self._writing = False
+
+    def _on_layer_changed(self, notice, sender):
+        if not self._writing:
+            self._dirty = True
+
+    def _on_layer_reloaded(self, notice, sender):
+        self.invalidate()
+
+    def invalidate(self):
+        self._specs.clear()
+        self._dirty = False
+        self.generation += 1
+
+    def _sweep(self):
+        self._dirty = False
+        expired = [key for key, spec in self._specs.items() if spec.expired]
+        for key in expired:
+            del self._specs[key]
+        if expired:
+            self.generation += 1
+
+    def refresh(self):
+        # drops the expired specs if the layer changed, returns the current generation
+        if self._dirty:
+            self._sweep()
+        return self.generation
+
+    def path(self, prim_path, name):
+        key = (prim_path, name)
+        path = self._paths.get(key)
+        if path is None:
+            path = Sdf.Path(prim_path).AppendProperty(name)
+            self._paths[key] = path
+        return path
+
+    def find(self, prim_path, name):
+        # the attribute spec, or None if the layer does not have it
+        if self._dirty:
+            self._sweep()
+        key = (prim_path, name)
+        attr = self._specs.get(key)
+        if attr is None:
+            attr = self._layer.GetAttributeAtPath(self.path(prim_path, name))
+            if not attr:
+                return None
+            self._specs[key] = attr
+        return attr
+
+    def attribute(self, prim_path, name):
+        attr = self.find(prim_path, name)
+        if attr is None:
+            raise Exception(f"Could not find attribute {prim_path}.{name}.")
+        return attr
+
+    def resolve(self, attr_paths):
+        # attr_paths are "<prim path>.<attribute>" strings
+        attrs = []
+        for attr_path in attr_paths:
+            prim_path, _, name = attr_path.rpartition(".")
+            attrs.append(self.attribute(prim_path, name))
+        return attrs
+
+
+class ValueWriter:
+    # writes values by their position in attr_paths, a list of "<prim path>.<Id>" strings, to the typed
+    # attributes declared by schemas, a dict of prim path -> schema. Ids missing from a schema are
+    # written to the attribute of the same name. Values are converted to the type of the attribute in
+    # the layer, values that can not be converted are rejected. The Ids that are elements of a vector
+    # attribute are gathered as doubles, and each vector that changed is converted to the array type and
+    # written once per call of write. With a value_filter, only the values it keeps are written. With a
+    # recorder, the written values are also passed to its record method. The values of attributes
+    # removed from the layer while writing are dropped
+    def __init__(self, index, attr_paths, schemas, recorder=None, value_filter=None):
+        self._index = index
+        self.recorder = recorder
+        self.value_filter = value_filter
+        self._targets = []
+        self._vectors = []
+        self._positions = {}
+        bindings = {prim_path: schema_bindings(schema) for prim_path, schema in schemas.items()}
+        vector_numbers = {}
+        for position, attr_path in enumerate(attr_paths):
+            prim_path, _, attr_name = attr_path.rpartition(".")
+            self._positions.setdefault(prim_path, {})[attr_name] = position
+            attribute, element = bindings.get(prim_path, {}).get(attr_name, (None, None))
+            if attribute is None:
+                self._targets.append((prim_path, attr_name, None))
+            elif element is None:
+                self._targets.append((prim_path, attribute.name, None))
+            else:
+                key = (prim_path, attribute.name)
+                if key not in vector_numbers:
+                    vector_numbers[key] = len(self._vectors)
+                    self._vectors.append((prim_path, attribute.name, len(attribute.elements)))
+                self._targets.append((prim_path, attribute.name, (vector_numbers[key], element)))
+        self._vector_values = [None] * len(self._vectors)
+        self._generation = None
+
+    def positions(self, prim_path):
+        # Id -> position of the Ids of one prim
+        return self._positions.get(prim_path, {})
+
+    def _resolve(self):
+        start = time.perf_counter()
+        index = self._index
+        self._attrs = [
+            index.find(prim_path, attr_name) if vector is None else None
+            for prim_path, attr_name, vector in self._targets
+        ]
+        # the attribute may have another type than the schema declares, e.g. when it was created before
+        self._casts = [value_cast(str(attr.typeName)) if attr is not None else None for attr in self._attrs]
+        self._elements = [vector for _, _, vector in self._targets]
+        self._vector_attrs = [index.find(prim_path, attr_name) for prim_path, attr_name, _ in self._vectors]
+        self._vector_casts = [
+            vector_cast(str(attr.typeName)) if attr is not None else None for attr in self._vector_attrs
+        ]
+        missing = [
+            f"{prim_path}.{attr_name}"
+            for attr, (prim_path, attr_name, vector) in zip(self._attrs, self._targets)
+            if attr is None and vector is None
+        ]
+        missing += [
+            f"{prim_path}.{attr_name}"
+            for attr, (prim_path, attr_name, _) in zip(self._vector_attrs, self._vectors)
+            if attr is None
+        ]
+        if missing:
+            print(f"Dropping the values of the missing attributes {', '.join(missing)}")
+        for number, (attr, (_, _, size)) in enumerate(zip(self._vector_attrs, self._vectors)):
+            if self._vector_values[number] is None:
+                # start from the current value so the elements that are not written yet keep it
+                current = attr.default if attr is not None else None
+                if current is not None and len(current) == size:
+                    self._vector_values[number] = np.array(current, dtype=np.float64)
+                else:
+                    self._vector_values[number] = np.zeros(size, dtype=np.float64)
+        self._generation = index.generation
+        registry.add_time("lookup", time.perf_counter() - start)
+
+    def write(self, positions, values, time_code=None):
+        # must be called inside AttributeIndex.writing(), ideally in a Sdf.ChangeBlock.
+        # time_code is the data time of the values for the recorder
+        if self.value_filter is not None:
+            received = len(positions)
+            positions, values = self.value_filter.apply(positions, values, time_code)
+            registry.count("values_suppressed", received - len(positions))
+        if self._generation != self._index.refresh():
+            self._resolve()
+        attrs = self._attrs
+        casts = self._casts
+        elements = self._elements
+        written = [] if self.recorder is not None else None
+        vector_attrs = self._vector_attrs
+        changed = set()
+        dropped = 0
+        rejected = 0
+        for position, value in zip(positions, values):
+            attr = attrs[position]
+            if attr is not None:
+                cast = casts[position]
+                if cast is not None:
+                    try:
+                        value = cast(value)
+                    except ValueError:
+                        rejected += 1
+                        continue
+                attr.default = value
+                if written is not None:
+                    written.append((attr, value))
+            elif elements[position] is not None:
+                number, element = elements[position]
+                try:
+                    self._vector_values[number][element] = value
+                except (TypeError, ValueError):
+                    rejected += 1
+                    continue
+                if vector_attrs[number] is not None:
+                    changed.add(number)
+                else:
+                    dropped += 1
+            else:
+                dropped += 1
+        for number in changed:
+            vector = self._vector_values[number]
+            cast = self._vector_casts[number]
+            if cast is not None:
+                vector = cast(vector)
+            vector_attrs[number].default = vector
+            if written is not None:
+                written.append((vector_attrs[number], vector.copy() if cast is None else vector))
+        registry.count("values_written", len(positions) - dropped - rejected)
+        if dropped:
+            registry.count("values_dropped", dropped)
+        if rejected:
+            registry.count("values_rejected", rejected)
+        registry.count("vectors_written", len(changed))
+        if written is not None:
+            self.recorder.record(time_code, written)
@@ -0,0 +1,212 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from iot_common.playback import PlaybackPlan, compile_plan, load_topic_data
+
+# bump when the layout of the cached arrays changes
+CACHE_VERSION = 1
+CACHE_ARRAYS = ["times", "ts", "offsets", "attr_indices", "values"]
+
+
+def cache_path(csv_path):
+    return f"{os.path.splitext(csv_path)[0]}.cache"
+
+
+def columnar_path(csv_path):
+    # generated data can be written in the layout of the cache instead of as a CSV file
+    return f"{os.path.splitext(csv_path)[0]}.columns"
+
+
+def _file_hash(path, block_size=1 << 20):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    with open(os.path.join(cache_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def _is_valid(csv_path, cache_dir, meta):
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+
+    stat = os.stat(csv_path)
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    # the file was touched, only rebuild if the contents changed
+    if meta["hash"] != _file_hash(csv_path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+def _load(cache_dir, meta):
+    arrays = {name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r") for name in CACHE_ARRAYS}
+    times = pd.DatetimeIndex(np.asarray(arrays["times"]))
+    if meta["tz"] is not None:
+        times = times.tz_localize("UTC").tz_convert(meta["tz"])
+    return PlaybackPlan(
+        meta["attr_names"], times, arrays["ts"], arrays["offsets"], arrays["attr_indices"], arrays["values"]
+    )
+
+
+def _save(csv_path, cache_dir, plan):
+    # the meta data is written last, a cache without it is never used
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+    tz = plan.times.tz
+    times = plan.times.tz_convert(None) if tz is not None else plan.times
+    arrays = {
+        "times": times.to_numpy(dtype="datetime64[ns]"),
+        "ts": plan.ts,
+        "offsets": plan.offsets,
+        "attr_indices": plan.attr_indices,
+        "values": plan.values,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(cache_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    stat = os.stat(csv_path)
+    meta = {
+        "version": CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": _file_hash(csv_path),
+        "tz": str(tz) if tz is not None else None,
+        "attr_names": plan.attr_names,
+    }
+    _write_meta(cache_dir, meta)
+
+
+class _ArrayAppender:
+    # writes a 1-D .npy file whose length is only known once every chunk has been appended. The
+    # header is reserved up front and written with the final shape on close
+    HEADER_SIZE = 128
+
+    def __init__(self, path, dtype):
+        self._dtype = np.dtype(dtype)
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * self.HEADER_SIZE)
+        self._count = 0
+
+    def append(self, array):
+        array = np.ascontiguousarray(array, dtype=self._dtype)
+        self._file.write(array.tobytes())
+        self._count += len(array)
+
+    def close(self):
+        descr = np.lib.format.dtype_to_descr(self._dtype)
+        header = repr({"descr": descr, "fortran_order": False, "shape": (self._count,)})
+        header = header.encode("latin1").ljust(self.HEADER_SIZE - 10 - 1) + b"\n"
+        self._file.seek(0)
+        self._file.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header)
+        self._file.close()
+
+
+class ColumnarWriter:
+    # streams a plan to a folder in the layout of the cache, a batch of rows at a time. The rows of
+    # a timestamp have to be written in a single call
+    def __init__(self, path, attr_names):
+        self._path = path
+        self._attr_names = attr_names
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        self._arrays = {
+            "times": _ArrayAppender(os.path.join(path, "times.npy"), "datetime64[ns]"),
+            "ts": _ArrayAppender(os.path.join(path, "ts.npy"), np.float64),
+            "offsets": _ArrayAppender(os.path.join(path, "offsets.npy"), np.int64),
+            "attr_indices": _ArrayAppender(os.path.join(path, "attr_indices.npy"), np.int32),
+            "values": _ArrayAppender(os.path.join(path, "values.npy"), np.float64),
+        }
+        self._arrays["offsets"].append([0])
+        self._rows = 0
+        self._start = None
+
+    def write(self, times, counts, attr_indices, values):
+        # times are the UTC timestamps and counts the number of rows of each of them
+        times = pd.DatetimeIndex(times)
+        times = times.tz_convert(None) if times.tz is not None else times
+        if len(times) == 0:
+            return
+        if self._start is None:
+            self._start = times[0]
+        self._arrays["times"].append(times.to_numpy(dtype="datetime64[ns]"))
+        self._arrays["ts"].append((times - self._start).total_seconds().to_numpy(dtype=np.float64))
+        self._arrays["offsets"].append(self._rows + np.cumsum(counts))
+        self._arrays["attr_indices"].append(attr_indices)
+        self._arrays["values"].append(values)
+        self._rows += int(np.sum(counts))
+
+    def close(self):
+        for array in self._arrays.values():
+            array.close()
+        _write_meta(self._path, {"version": CACHE_VERSION, "tz": "UTC", "attr_names": self._attr_names})
+
+
+def load_columnar(path):
+    meta = _read_meta(path)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        raise Exception(f"Could not load the columnar data {path}.")
+    return _load(path, meta)
+
+
+def load_plan(csv_path, use_cache=True):
+    # compile the playback plan of a CSV file, reusing the memory mapped cache next to it when
+    # the file has not changed since the cache was written. Generated columnar data is loaded as is
+    if not os.path.exists(csv_path) and os.path.isdir(columnar_path(csv_path)):
+        return load_columnar(columnar_path(csv_path))
+    if not use_cache:
+        return compile_plan(load_topic_data(csv_path))
+
+    cache_dir = cache_path(csv_path)
+    meta = _read_meta(cache_dir)
+    if _is_valid(csv_path, cache_dir, meta):
+        return _load(cache_dir, meta)
+
+    plan = compile_plan(load_topic_data(csv_path))
+    try:
+        _save(csv_path, cache_dir, plan)
+    except OSError as e:
+        print(f"Could not write the cache {cache_dir}: {e}")
+    return plan
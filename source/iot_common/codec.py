@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# Compact MQTT payloads. A packed payload is a header followed by the attribute indices as
+# little-endian uint16 and the values as little-endian float64. The indices refer to a schema, the
+# list of attribute names of a topic, which the publisher sends as JSON on "<topic>/schema" before
+# the data and at intervals after. Subscribers map the indices to attributes once per schema.
+# JSON payloads remain the default and are always accepted by the decoder.
+
+import json
+import struct
+import threading
+import zlib
+import numpy as np
+
+PACKED_MAGIC = 0xA5
+PACKED_VERSION = 1
+# magic, version, schema id
+PACKED_HEADER = struct.Struct("<BBI")
+# the indices are uint16, so a schema has at most this many attributes
+MAX_PACKED_ATTRIBUTES = 1 << 16
+
+
+def schema_topic(topic):
+    return f"{topic}/schema"
+
+
+def schema_id(attr_names):
+    return zlib.crc32("\n".join(attr_names).encode("utf-8"))
+
+
+def check_schema_size(attr_names):
+    if len(attr_names) > MAX_PACKED_ATTRIBUTES:
+        raise ValueError(
+            f"A packed payload schema has at most {MAX_PACKED_ATTRIBUTES} attributes, not {len(attr_names)}"
+        )
+
+
+def encode_schema(attr_names):
+    check_schema_size(attr_names)
+    return json.dumps(
+        {"format": "packed", "version": PACKED_VERSION, "id": schema_id(attr_names), "attributes": attr_names}
+    ).encode("utf-8")
+
+
+def encode_packed(schema, attr_indices, values):
+    attr_indices = np.asarray(attr_indices)
+    if len(attr_indices) > 0 and (attr_indices.min() < 0 or attr_indices.max() >= MAX_PACKED_ATTRIBUTES):
+        raise ValueError(f"Packed attribute indices must be below {MAX_PACKED_ATTRIBUTES}")
+    return (
+        PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, schema)
+        + attr_indices.astype("<u2").tobytes()
+        + np.asarray(values, dtype="<f8").tobytes()
+    )
+
+
+def encode_json(values):
+    return json.dumps(values, indent=2).encode("utf-8")
+
+
+class PayloadDecoder:
+    # decodes JSON and packed payloads into a dict of attribute name to value. on_schema is called
+    # from the network thread while decode may run on the writer thread
+    def __init__(self):
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def on_schema(self, payload):
+        schema = json.loads(payload)
+        if schema.get("format") != "packed" or schema.get("version") != PACKED_VERSION:
+            raise ValueError(f"Unsupported payload schema {schema.get('format')} {schema.get('version')}")
+        attr_names = list(schema["attributes"])
+        check_schema_size(attr_names)
+        with self._lock:
+            self._schemas[schema["id"]] = attr_names
+
+    def decode(self, payload):
+        if len(payload) == 0 or payload[0] != PACKED_MAGIC:
+            values = json.loads(payload)
+            if not isinstance(values, dict):
+                raise ValueError("A JSON payload must be an object of attribute names and values")
+            return values
+
+        if len(payload) < PACKED_HEADER.size:
+            raise ValueError("Truncated packed payload")
+        magic, version, schema = PACKED_HEADER.unpack_from(payload)
+        if version != PACKED_VERSION:
+            raise ValueError(f"Unsupported packed payload version {version}")
+        with self._lock:
+            attr_names = self._schemas.get(schema)
+        if attr_names is None:
+            raise ValueError(f"Unknown payload schema {schema}, waiting for the schema message")
+
+        count, remainder = divmod(len(payload) - PACKED_HEADER.size, 10)
+        if remainder != 0:
+            raise ValueError("Truncated packed payload")
+        attr_indices = np.frombuffer(payload, dtype="<u2", count=count, offset=PACKED_HEADER.size)
+        values = np.frombuffer(payload, dtype="<f8", count=count, offset=PACKED_HEADER.size + count * 2)
+        if count > 0 and attr_indices.max() >= len(attr_names):
+            raise ValueError(f"Attribute index {attr_indices.max()} is not in payload schema {schema}")
+        return {attr_names[attr_index]: value for attr_index, value in zip(attr_indices.tolist(), values.tolist())}
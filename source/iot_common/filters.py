@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import math
+import time
+from iot_common.schema import schema_bindings
+
+
+def _unchanged(value, last, deadband, relative_deadband):
+    if value == last:
+        return True
+    if isinstance(value, bool) or isinstance(last, bool):
+        return False
+    if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+        return False
+    if math.isnan(value) or math.isnan(last):
+        return math.isnan(value) and math.isnan(last)
+    return abs(value - last) <= max(deadband, relative_deadband * abs(last))
+
+
+class DeadbandFilter:
+    # drops the values that did not change by more than a deadband since the last value that was kept.
+    # The deadband is the larger of deadband and relative_deadband times the last kept value, with
+    # both 0 only changed values are kept. A value is kept regardless once heartbeat seconds have passed
+    # since the last value kept for its attribute, 0 turns the heartbeat off. Values are filtered by
+    # their position in attr_paths and the attributes of schemas may override the deadbands, like
+    # ValueWriter
+    def __init__(self, attr_paths, schemas, deadband=0.0, relative_deadband=0.0, heartbeat=60.0):
+        self._heartbeat = heartbeat
+        self._names = []
+        self._deadbands = []
+        self._relative_deadbands = []
+        bindings = {prim_path: schema_bindings(schema) for prim_path, schema in schemas.items()}
+        for attr_path in attr_paths:
+            prim_path, _, attr_name = attr_path.rpartition(".")
+            attribute, _ = bindings.get(prim_path, {}).get(attr_name, (None, None))
+            self._names.append(attr_path)
+            self._deadbands.append(
+                attribute.deadband if attribute is not None and attribute.deadband is not None else deadband
+            )
+            self._relative_deadbands.append(
+                attribute.relative_deadband
+                if attribute is not None and attribute.relative_deadband is not None
+                else relative_deadband
+            )
+        count = len(attr_paths)
+        self._last_values = [None] * count
+        self._last_times = [None] * count
+        self._received = [0] * count
+        self._kept = [0] * count
+
+    def apply(self, positions, values, time_code=None):
+        # time_code is the data time of the values, the heartbeat uses the wall clock without it
+        now = time.monotonic() if time_code is None else time_code
+        last_values = self._last_values
+        last_times = self._last_times
+        deadbands = self._deadbands
+        relative_deadbands = self._relative_deadbands
+        kept_positions = []
+        kept_values = []
+        for position, value in zip(positions, values):
+            self._received[position] += 1
+            last_time = last_times[position]
+            if (
+                last_time is not None
+                and (self._heartbeat <= 0 or now - last_time < self._heartbeat)
+                and _unchanged(value, last_values[position], deadbands[position], relative_deadbands[position])
+            ):
+                continue
+            last_values[position] = value
+            last_times[position] = now
+            self._kept[position] += 1
+            kept_positions.append(position)
+            kept_values.append(value)
+        return kept_positions, kept_values
+
+    def ratios(self):
+        # the share of the values of each attribute that was suppressed
+        return {
+            name: 1.0 - kept / received
+            for name, received, kept in zip(self._names, self._received, self._kept)
+            if received > 0
+        }
+
+    def report(self, limit=10):
+        # the overall suppression and the attributes with the least suppression, which are the ones
+        # worth tuning
+        received = sum(self._received)
+        kept = sum(self._kept)
+        ratio = 1.0 - kept / received if received > 0 else 0.0
+        lines = [f"filtered: {received} suppressed: {received - kept} ({ratio * 100.0:.1f}%)"]
+        for name, attr_ratio in sorted(self.ratios().items(), key=lambda item: item[1])[:limit]:
+            lines.append(f"  {name}: {attr_ratio * 100.0:.1f}% suppressed")
+        return "\n".join(lines)
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import collections
+import queue
+import threading
+import time
+from pxr import Sdf
+
+
+class HistoryRecorder:
+    # records the values written to the live layer as time samples on a separate history layer, so the
+    # live layer keeps only defaults. Values are downsampled to at most rate samples per second of data
+    # time, the latest value of each attribute in between is kept. The samples of each attribute are a
+    # ring buffer, the oldest are erased beyond max_samples or when older than max_age seconds, 0 turns
+    # either limit off. Every save_interval seconds the layer is exported and a background thread
+    # writes it to url, so the writer never waits for Nucleus
+    def __init__(self, url, rate=1.0, max_samples=3600, max_age=0.0, save_interval=30.0):
+        self._url = url
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._max_samples = max_samples
+        self._max_age = max_age
+        self._save_interval = save_interval
+        self.layer = Sdf.Layer.CreateAnonymous("history.usda")
+        self.layer.timeCodesPerSecond = 1
+        self._pending = {}
+        self._times = {}
+        self._start = time.monotonic()
+        self._last_time = None
+        self._last_sample = None
+        self._last_save = self._start
+        self._saves = queue.Queue(1)
+        self._thread = threading.Thread(target=self._run_saves, name="HistoryRecorder", daemon=True)
+        self._thread.start()
+        self.samples = 0
+        self.evicted = 0
+        self.saved = 0
+        self.save_errors = 0
+
+    def record(self, time_code, attrs_values):
+        # attrs_values are (live layer attribute spec, value) pairs. time_code is the data time in
+        # seconds, None uses the seconds since the recorder started. Samples are never written before
+        # the latest time recorded so far
+        if time_code is None:
+            time_code = time.monotonic() - self._start
+        for attr, value in attrs_values:
+            self._pending[attr.path] = (attr.typeName, value)
+        if self._last_time is None or time_code > self._last_time:
+            self._last_time = time_code
+        if self._last_sample is None or (
+            self._last_time > self._last_sample and self._last_time - self._last_sample >= self._interval
+        ):
+            self._sample(self._last_time)
+        if time.monotonic() - self._last_save >= self._save_interval:
+            self._save()
+
+    def _sample(self, time_code):
+        layer = self.layer
+        with Sdf.ChangeBlock():
+            for path, (type_name, value) in self._pending.items():
+                times = self._times.get(path)
+                if times is None:
+                    Sdf.JustCreatePrimAttributeInLayer(layer, path, type_name)
+                    times = collections.deque()
+                    self._times[path] = times
+                layer.SetTimeSample(path, time_code, value)
+                if not times or times[-1] != time_code:
+                    times.append(time_code)
+                self.samples += 1
+
+            # evict from every attribute, including the ones that stopped reporting
+            limit = time_code - self._max_age if self._max_age > 0 else None
+            for path, times in self._times.items():
+                while times and (
+                    (self._max_samples > 0 and len(times) > self._max_samples)
+                    or (limit is not None and times[0] < limit)
+                ):
+                    layer.EraseTimeSample(path, times.popleft())
+                    self.evicted += 1
+        self._pending.clear()
+        self._last_sample = time_code
+
+    def _save(self):
+        self._last_save = time.monotonic()
+        retained = [times for times in self._times.values() if times]
+        if retained:
+            self.layer.startTimeCode = min(times[0] for times in retained)
+            self.layer.endTimeCode = max(times[-1] for times in retained)
+        content = self.layer.ExportToString().encode()
+        # only the latest export is worth writing
+        while True:
+            try:
+                self._saves.put_nowait(content)
+                break
+            except queue.Full:
+                try:
+                    self._saves.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run_saves(self):
+        while True:
+            content = self._saves.get()
+            if content is None:
+                return
+            error = self._write(content)
+            if error is None:
+                self.saved += 1
+            else:
+                self.save_errors += 1
+                print(f"Could not save the history layer {self._url}: {error}")
+
+    def _write(self, content):
+        # returns the error, None when the layer was written. omni.client is only needed to save, so
+        # recording works without it
+        import omni.client
+
+        result = omni.client.write_file(self._url, content)
+        return None if result == omni.client.Result.OK else result
+
+    def close(self):
+        # sample what is pending, save a last time and wait for the save to finish
+        if self._pending:
+            self._sample(self._last_time)
+        self._save()
+        self._saves.put(None)
+        self._thread.join()
+
+    def report(self):
+        return (
+            f"history samples: {self.samples} evicted: {self.evicted} saved: {self.saved} "
+            f"save errors: {self.save_errors}"
+        )
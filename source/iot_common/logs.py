@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import collections
+import itertools
+import signal
+import omni.client
+
+
+class LogBuffer:
+    # keeps the last capacity log messages of the client library. The library only sends messages at
+    # or above level, so lower levels cost nothing. The handler is called from the library's threads,
+    # appending to a bounded deque is atomic so it takes no lock. dump() prints the messages, it is
+    # called on failure and on SIGUSR1 where the platform has it
+    def __init__(self, capacity=1000):
+        self._messages = collections.deque(maxlen=capacity)
+        self._count = itertools.count()
+
+    def handler(self, thread, component, level, message):
+        # the sequence number shows how many messages were dropped from the front
+        self._messages.append((next(self._count), thread, component, level, message))
+
+    def install(self, level="WARNING"):
+        log_level = getattr(omni.client.LogLevel, level.upper(), None)
+        if log_level is None:
+            raise Exception(f"Unknown log level {level}.")
+        omni.client.set_log_level(log_level)
+        omni.client.set_log_callback(self.handler)
+        dump_signal = getattr(signal, "SIGUSR1", None)
+        if dump_signal is not None:
+            signal.signal(dump_signal, lambda signum, frame: self.dump())
+
+    def dump(self):
+        messages = self._messages.copy()
+        received = messages[-1][0] + 1 if messages else 0
+        print(f"---- LOG MESSAGES (last {len(messages)} of {received}) ---")
+        print(*messages, sep="\n")
+        print("----")
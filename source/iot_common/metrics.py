@@ -0,0 +1,195 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    # counters, stage timers and histograms of the ingest apps. An update is a dict lookup and a few
+    # adds, so they are cheap enough to leave on. Updates are not locked, they come from at most a
+    # couple of threads and a lost increment does not matter for monitoring
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self, buckets=None):
+        # drops every value, and changes the histogram buckets if given
+        if buckets is not None:
+            self._buckets = tuple(buckets)
+        self.counters = {}
+        self.timers = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        # [calls, total seconds, max seconds] of a stage
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+
+    def observe(self, name, value):
+        # [count per bucket with one more for the values above the last bound, count, sum]
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = [[0] * (len(self._buckets) + 1), 0, 0.0]
+        histogram[0][bisect.bisect_left(self._buckets, value)] += 1
+        histogram[1] += 1
+        histogram[2] += value
+
+    def quantile(self, name, q):
+        # estimated as the upper bound of the bucket the quantile falls in
+        histogram = self.histograms.get(name)
+        if histogram is None or histogram[1] == 0:
+            return 0.0
+        rank = q * histogram[1]
+        total = 0
+        for bound, count in zip(self._buckets + (float("inf"),), histogram[0]):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def to_json(self):
+        return {
+            "uptime": time.time() - self.started,
+            "counters": dict(self.counters),
+            "timers": {
+                name: {"calls": calls, "total": total, "mean": total / calls if calls else 0.0, "max": longest}
+                for name, (calls, total, longest) in list(self.timers.items())
+            },
+            "histograms": {
+                name: {
+                    "count": count,
+                    "sum": total,
+                    "p50": self.quantile(name, 0.5),
+                    "p99": self.quantile(name, 0.99),
+                }
+                for name, (_, count, total) in list(self.histograms.items())
+            },
+        }
+
+    def to_prometheus(self, prefix="iot"):
+        lines = []
+        for name, value in sorted(list(self.counters.items())):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        if self.timers:
+            lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+            lines.append(f"# TYPE {prefix}_stage_seconds_total counter")
+            lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for name, (calls, total, longest) in sorted(list(self.timers.items())):
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {calls}')
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {longest}')
+        for name, (counts, count, total) in sorted(list(self.histograms.items())):
+            lines.append(f"# TYPE {prefix}_{name}_seconds histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_{name}_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_seconds_sum {total}")
+            lines.append(f"{prefix}_{name}_seconds_count {count}")
+        return "\n".join(lines) + "\n"
+
+
+# shared by the modules of a process, so the stages do not have to pass it around
+registry = Metrics()
+
+
+class MetricsExporter:
+    # serves the metrics on http://<host>:<port>/metrics in the Prometheus text format and on
+    # /metrics.json, and/or writes the JSON to path every interval seconds. port 0 and path None turn
+    # either off
+    def __init__(self, metrics=None, port=0, path=None, interval=10.0, host="127.0.0.1"):
+        self._metrics = metrics if metrics is not None else registry
+        self._port = port
+        self._path = path
+        self._interval = interval
+        self._host = host
+        self._server = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        metrics = self._metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.to_json()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        if self._port:
+            self._server = ThreadingHTTPServer((self._host, self._port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+        if self._path:
+            self._thread = threading.Thread(target=self._run_dumps, name="MetricsDump", daemon=True)
+            self._thread.start()
+        return self
+
+    def _dump(self):
+        with open(self._path, "w") as f:
+            json.dump(self._metrics.to_json(), f, indent=2)
+
+    def _run_dumps(self):
+        while not self._stop.wait(self._interval):
+            self._dump()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._dump()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,325 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# pip install pandas
+
+import collections
+import heapq
+import numpy as np
+import pandas as pd
+
+# a group of values that share a timestamp, ts is the offset in seconds from the start of the data.
+# paced is False for the catch-up batch written when seeking, which is applied immediately
+Batch = collections.namedtuple("Batch", ["time", "ts", "attr_indices", "values", "paced"])
+
+
+def _prepare(data, categories=None):
+    # drop ms from the timestamps and intern the Ids
+    data["TimeStamp"] = pd.to_datetime(data["TimeStamp"]).dt.floor("s")
+    data = data.dropna(subset=["TimeStamp", "Id"])
+    ids = data["Id"].astype(str)
+    if categories is not None:
+        # Ids that are not one of the categories, e.g. missing from a device schema, are skipped
+        known = ids.isin(categories.categories)
+        data = data[known]
+        ids = ids[known]
+    data["Id"] = ids.astype(categories if categories is not None else "category")
+    data["Value"] = data["Value"].astype(np.float64)
+    return data
+
+
+def _group(data):
+    # stable sort keeps the file order of the rows within each timestamp
+    order = np.argsort(data["TimeStamp"].to_numpy(), kind="stable")
+    times = data["TimeStamp"].iloc[order]
+    attr_indices = data["Id"].cat.codes.to_numpy()[order].astype(np.int32)
+    values = np.ascontiguousarray(data["Value"].to_numpy()[order])
+
+    _, starts = np.unique(times.to_numpy(), return_index=True)
+    offsets = np.append(starts, len(times)).astype(np.int64)
+    return pd.DatetimeIndex(times.iloc[starts]), offsets, attr_indices, values
+
+
+def _time_offset(value, start_time):
+    # accepts seconds from the start of the data or an absolute timestamp
+    try:
+        return float(value)
+    except ValueError:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is None and start_time.tzinfo is not None:
+            timestamp = timestamp.tz_localize(start_time.tzinfo)
+        return (timestamp - start_time).total_seconds()
+
+
+def _latest(attr_indices, values):
+    # last value written to each attribute
+    latest, first = np.unique(attr_indices[::-1], return_index=True)
+    return latest, values[::-1][first]
+
+
+def load_topic_data(csv_path):
+    # parse the whole CSV once
+    return _prepare(pd.read_csv(csv_path, usecols=["TimeStamp", "Id", "Value"]))
+
+
+def scan_attr_names(csv_path, chunksize):
+    # find the unique Ids without holding the file in memory
+    attr_names = set()
+    for chunk in pd.read_csv(csv_path, usecols=["Id"], chunksize=chunksize):
+        attr_names.update(chunk["Id"].dropna().astype(str).unique())
+    return sorted(attr_names)
+
+
+class PlaybackPlan:
+    # columnar playback data, batch i is the slice offsets[i]:offsets[i + 1]
+    # of the attr_indices and values arrays
+    def __init__(self, attr_names, times, ts, offsets, attr_indices, values):
+        self.attr_names = attr_names
+        self.times = times
+        self.ts = ts
+        self.offsets = offsets
+        self.attr_indices = attr_indices
+        self.values = values
+
+    def __len__(self):
+        return len(self.ts)
+
+    def batch(self, index):
+        begin = self.offsets[index]
+        end = self.offsets[index + 1]
+        return self.attr_indices[begin:end], self.values[begin:end]
+
+    def time_offset(self, value):
+        return _time_offset(value, self.times[0])
+
+    def index_at(self, offset):
+        # first batch at or after the given offset in seconds
+        return int(np.searchsorted(self.ts, offset, side="left"))
+
+    def snapshot(self, index):
+        # latest value of every attribute written by the batches before index
+        end = self.offsets[index]
+        return _latest(self.attr_indices[:end], self.values[:end])
+
+    def batches(self, seek="0"):
+        if len(self) == 0:
+            return
+        start_index = self.index_at(self.time_offset(seek))
+        if start_index > 0:
+            attr_indices, values = self.snapshot(start_index)
+            yield Batch(self.times[start_index - 1], self.ts[start_index - 1], attr_indices, values, False)
+        for index in range(start_index, len(self)):
+            attr_indices, values = self.batch(index)
+            yield Batch(self.times[index], self.ts[index], attr_indices, values, True)
+
+
+def _make_plan(attr_names, group_times, offsets, attr_indices, values):
+    if len(group_times) > 0:
+        ts = (group_times - group_times[0]).total_seconds().to_numpy(dtype=np.float64)
+    else:
+        ts = np.empty(0, dtype=np.float64)
+    return PlaybackPlan(attr_names, group_times, ts, offsets, attr_indices, values)
+
+
+def compile_plan(data):
+    group_times, offsets, attr_indices, values = _group(data)
+    return _make_plan([str(name) for name in data["Id"].cat.categories], group_times, offsets, attr_indices, values)
+
+
+def _utc(times):
+    # naive timestamps are taken to be UTC so devices from different files can be ordered
+    return times.tz_convert("UTC") if times.tz is not None else times.tz_localize("UTC")
+
+
+def merge_plans(plans):
+    # merge the plans of several devices into a single time ordered plan. plans maps each topic to
+    # its plan, the merged attributes are named "<topic>.<attribute>" and each device also gets a
+    # "<topic>._ts" value, its own offset in seconds, for every one of its timestamps
+    attr_names = []
+    row_times = []
+    attr_indices = []
+    values = []
+    for topic, plan in plans.items():
+        base = len(attr_names)
+        attr_names.extend(f"{topic}.{attr_name}" for attr_name in plan.attr_names)
+        attr_names.append(f"{topic}._ts")
+        times = _utc(plan.times).to_numpy(dtype="datetime64[ns]")
+
+        row_times.append(np.repeat(times, np.diff(plan.offsets)))
+        attr_indices.append(np.asarray(plan.attr_indices) + base)
+        values.append(np.asarray(plan.values))
+        row_times.append(times)
+        attr_indices.append(np.full(len(plan), base + len(plan.attr_names), dtype=np.int32))
+        values.append(np.asarray(plan.ts))
+
+    if len(row_times) == 0:
+        return _make_plan([], pd.DatetimeIndex([], tz="UTC"), np.zeros(1, np.int64), np.empty(0, np.int32), np.empty(0))
+
+    # stable sort keeps each device's rows together within a timestamp
+    row_times = np.concatenate(row_times)
+    order = np.argsort(row_times, kind="stable")
+    row_times = row_times[order]
+    _, starts = np.unique(row_times, return_index=True)
+    return _make_plan(
+        attr_names,
+        pd.DatetimeIndex(row_times[starts]).tz_localize("UTC"),
+        np.append(starts, len(row_times)).astype(np.int64),
+        np.concatenate(attr_indices)[order].astype(np.int32),
+        np.ascontiguousarray(np.concatenate(values)[order]),
+    )
+
+
+def _stream_groups(csv_path, categories, chunksize):
+    # yields the complete timestamp groups of each chunk. The rows of the last timestamp in a chunk
+    # are carried over, as the group may continue in the next chunk
+    last_time = None
+    carry = None
+    for chunk in pd.read_csv(csv_path, usecols=["TimeStamp", "Id", "Value"], chunksize=chunksize):
+        # rows with Ids that are not one of the categories were dropped by _prepare
+        chunk = _prepare(chunk, categories)
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if len(chunk) == 0:
+            continue
+
+        grouped = _group(chunk)
+        group_times = grouped[0]
+        if last_time is not None and group_times[0] <= last_time:
+            raise Exception(f"{csv_path} is not ordered by TimeStamp, it can not be streamed.")
+        count = len(group_times) - 1
+        if count > 0:
+            yield grouped, count
+            last_time = group_times[count - 1]
+        carry = chunk[chunk["TimeStamp"] == group_times[-1]]
+
+    if carry is not None and len(carry) > 0:
+        grouped = _group(carry)
+        yield grouped, len(grouped[0])
+
+
+def seek_batches(batches, attr_count, seek="0"):
+    # skip the batches before the seek time, their values are folded into a single catch-up batch
+    # that is yielded ahead of the first batch at or after the seek time
+    seek_offset = None
+    catch_up = None
+    latest = np.zeros(attr_count, dtype=np.float64)
+    seen = np.zeros(attr_count, dtype=bool)
+
+    for batch in batches:
+        if seek_offset is None:
+            seek_offset = _time_offset(seek, batch.time - pd.Timedelta(seconds=batch.ts))
+        if batch.ts < seek_offset:
+            written, written_values = _latest(batch.attr_indices, batch.values)
+            latest[written] = written_values
+            seen[written] = True
+            catch_up = (batch.time, batch.ts)
+            continue
+        if catch_up is not None:
+            written = np.flatnonzero(seen).astype(np.int32)
+            yield Batch(catch_up[0], catch_up[1], written, latest[written], False)
+            catch_up = None
+        yield batch
+
+    if catch_up is not None:
+        written = np.flatnonzero(seen).astype(np.int32)
+        yield Batch(catch_up[0], catch_up[1], written, latest[written], False)
+
+
+def _stream(csv_path, attr_names, chunksize):
+    start_time = None
+    for (group_times, offsets, attr_indices, values), count in _stream_groups(
+        csv_path, pd.CategoricalDtype(attr_names), chunksize
+    ):
+        if start_time is None:
+            start_time = group_times[0]
+        ts = (group_times - start_time).total_seconds().to_numpy(dtype=np.float64)
+        for index in range(count):
+            begin = offsets[index]
+            end = offsets[index + 1]
+            yield Batch(group_times[index], ts[index], attr_indices[begin:end], values[begin:end], True)
+
+
+def stream_batches(csv_path, attr_names, seek="0", chunksize=100000):
+    # streaming counterpart of PlaybackPlan.batches, memory is bounded by the chunk size.
+    # The file must be ordered by TimeStamp, although rows within a chunk may be out of order
+    return seek_batches(_stream(csv_path, attr_names, chunksize), len(attr_names), seek)
+
+
+def _utc_ns(timestamp):
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value
+
+
+class MergedStream:
+    # k-way merge of the batch streams of several devices into one time ordered stream. A heap holds
+    # the next batch of every device, so only one batch per device is in memory besides what the
+    # streams themselves buffer. streams maps each topic to (attr_names, batches) and the merged
+    # attributes are named and indexed the same way as in merge_plans. Like the streams it is built
+    # from, it can only be played back once
+    def __init__(self, streams):
+        self.attr_names = []
+        self._heap = []
+        for order, (topic, (attr_names, batches)) in enumerate(streams.items()):
+            base = len(self.attr_names)
+            self.attr_names.extend(f"{topic}.{attr_name}" for attr_name in attr_names)
+            self.attr_names.append(f"{topic}._ts")
+            batches = iter(batches)
+            batch = next(batches, None)
+            if batch is not None:
+                self._heap.append((_utc_ns(batch.time), order, batch, batches, base, base + len(attr_names)))
+        heapq.heapify(self._heap)
+
+    def _merge(self):
+        heap = self._heap
+        if len(heap) == 0:
+            return
+        start = heap[0][0]
+        while heap:
+            key = heap[0][0]
+            attr_indices = []
+            values = []
+            # pop every device with data at this timestamp, in topic order
+            while heap and heap[0][0] == key:
+                _, order, batch, batches, base, ts_index = heapq.heappop(heap)
+                attr_indices.append(np.asarray(batch.attr_indices, dtype=np.int32) + base)
+                attr_indices.append(np.array([ts_index], dtype=np.int32))
+                values.append(np.asarray(batch.values))
+                values.append(np.array([batch.ts], dtype=np.float64))
+
+                batch = next(batches, None)
+                if batch is not None:
+                    next_key = _utc_ns(batch.time)
+                    if next_key <= key:
+                        raise Exception(f"The data of {self.attr_names[ts_index]} is not ordered by TimeStamp.")
+                    heapq.heappush(heap, (next_key, order, batch, batches, base, ts_index))
+
+            yield Batch(
+                pd.Timestamp(key, tz="UTC"),
+                (key - start) / 1e9,
+                np.concatenate(attr_indices),
+                np.concatenate(values),
+                True,
+            )
+
+    def batches(self, seek="0"):
+        return seek_batches(self._merge(), len(self.attr_names), seek)
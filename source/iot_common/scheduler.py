@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import collections
+import time
+
+
+class Scheduler:
+    # paces a playback loop against absolute deadlines on time.monotonic() so the time spent
+    # writing and flushing is not added on top of every sleep. speed scales the source offsets,
+    # 0 plays back as fast as possible
+    def __init__(self, speed=1.0, max_coalesce=0.5, lag_window=4096):
+        self.speed = speed
+        self.max_coalesce = max_coalesce
+        self.frames = 0
+        self.late = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._origin = None
+        self._base = 0.0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lags = collections.deque(maxlen=lag_window)
+
+    def start(self, offset=0.0):
+        self._origin = time.monotonic()
+        self._base = offset
+
+    def deadline(self, offset):
+        if self.speed <= 0:
+            return self._origin
+        return self._origin + (offset - self._base) / self.speed
+
+    def is_late(self, offset):
+        return self.speed > 0 and time.monotonic() > self.deadline(offset)
+
+    def wait(self, offset):
+        # sleep until the deadline of offset and return how late we are
+        if self._origin is None:
+            self.start(offset)
+        now = time.monotonic()
+        deadline = self.deadline(offset)
+        if deadline > now:
+            time.sleep(deadline - now)
+            lag = 0.0
+        else:
+            lag = now - deadline if self.speed > 0 else 0.0
+        self.frames += 1
+        if lag > 0:
+            self.late += 1
+        self._lag_total += lag
+        self._lag_max = max(self._lag_max, lag)
+        self._lags.append(lag)
+        return lag
+
+    def drop(self, count=1):
+        self.dropped += count
+
+    def coalesce(self, count=1):
+        self.coalesced += count
+
+    def stats(self):
+        elapsed = time.monotonic() - self._origin if self._origin is not None else 0.0
+        lags = sorted(self._lags)
+        return {
+            "frames": self.frames,
+            "late": self.late,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "elapsed": elapsed,
+            "rate": self.frames / elapsed if elapsed > 0 else 0.0,
+            "lag_mean": self._lag_total / self.frames if self.frames else 0.0,
+            "lag_p99": lags[int(0.99 * (len(lags) - 1))] if lags else 0.0,
+            "lag_max": self._lag_max,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (
+            f"frames: {stats['frames']} late: {stats['late']} dropped: {stats['dropped']} "
+            f"coalesced: {stats['coalesced']} rate: {stats['rate']:.2f}/s "
+            f"lag mean: {stats['lag_mean'] * 1000:.1f}ms p99: {stats['lag_p99'] * 1000:.1f}ms "
+            f"max: {stats['lag_max'] * 1000:.1f}ms"
+        )
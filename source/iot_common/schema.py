@@ -0,0 +1,231 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import json
+import os
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from pxr import Sdf
+
+# an attribute of a device, type is a Sdf value type name such as "double", "int", "bool" or "token".
+# A vector attribute has an array type such as "double[]" and packs the values of the Ids listed in
+# elements, so a bank of sensors is written as one attribute. deadband and relative_deadband override the
+# change filter thresholds of the attribute
+Attribute = namedtuple("Attribute", "name type unit elements deadband relative_deadband", defaults=(None, None, None))
+
+# USD ints are 32 bit
+INT_MIN = -(1 << 31)
+INT_MAX = (1 << 31) - 1
+
+
+def _to_int(value):
+    # values out of range are clamped, NaN has no int value and is written as 0
+    if value != value:
+        return 0
+    return int(round(min(max(value, INT_MIN), INT_MAX)))
+
+
+_TRUE = ("true", "yes", "on", "1")
+_FALSE = ("false", "no", "off", "0")
+
+
+def _to_bool(value):
+    # the common spellings of true and false, and the numbers 1 and 0. Anything else is a ValueError
+    if isinstance(value, str):
+        spelling = value.strip().lower()
+        if spelling in _TRUE:
+            return True
+        if spelling in _FALSE:
+            return False
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = None
+        if number == 1:
+            return True
+        if number == 0:
+            return False
+    raise ValueError(f"{value!r} is not a bool")
+
+
+def _to_int_array(values):
+    return np.rint(np.nan_to_num(np.clip(values, INT_MIN, INT_MAX), nan=0)).astype(np.int32)
+
+
+def _to_bool_array(values):
+    # NaN has no bool value and is written as false
+    return np.nan_to_num(values, nan=0) != 0
+
+
+# values are doubles when they come from a CSV and whatever JSON yields when they come from MQTT,
+# they are converted to the type of the attribute before they are written
+_CASTS = {
+    "int": _to_int,
+    "bool": _to_bool,
+    "string": str,
+    "token": str,
+}
+
+# the elements of a vector attribute are gathered as doubles and converted as a whole, these are the
+# array types a vector attribute can have
+_ARRAY_CASTS = {
+    "double[]": None,
+    "float[]": lambda values: values.astype(np.float32),
+    "half[]": lambda values: values.astype(np.float16),
+    "int[]": _to_int_array,
+    "bool[]": _to_bool_array,
+}
+
+
+def _value_type(type_name):
+    value_type = Sdf.ValueTypeNames.Find(type_name)
+    if not value_type:
+        raise Exception(f"Unknown attribute type {type_name}.")
+    return value_type
+
+
+def value_cast(type_name):
+    # None when the value can be written as it is
+    return _CASTS.get(type_name)
+
+
+def vector_cast(type_name):
+    # converts the doubles of a vector to the array type, None when they can be written as they are
+    if type_name not in _ARRAY_CASTS:
+        raise Exception(f"A vector attribute can not be a {type_name}, use one of {', '.join(_ARRAY_CASTS)}.")
+    return _ARRAY_CASTS[type_name]
+
+
+def _check(attribute):
+    value_type = _value_type(attribute.type)
+    if value_type.isArray and not attribute.elements:
+        raise Exception(f"The vector attribute {attribute.name} has no elements.")
+    if value_type.isArray:
+        vector_cast(str(value_type))
+    if attribute.elements and not value_type.isArray:
+        raise Exception(f"The attribute {attribute.name} has elements but is not an array type.")
+    return attribute
+
+
+def load_schema(manifest_path):
+    # a manifest declares the attributes of a device, e.g.
+    # {"attributes": [{"name": "Velocity", "type": "double", "unit": "m/s"},
+    #                 {"name": "Vibration", "type": "double[]", "elements": ["Vibration_0", "Vibration_1"]}]}
+    # type defaults to double, unit is optional and elements are the Ids packed into a vector attribute.
+    # deadband and relative_deadband are optional as well
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    schema = []
+    for entry in manifest["attributes"]:
+        elements = entry.get("elements")
+        schema.append(
+            _check(
+                Attribute(
+                    str(entry["name"]),
+                    entry.get("type", "double"),
+                    entry.get("unit"),
+                    [str(element) for element in elements] if elements else None,
+                    entry.get("deadband"),
+                    entry.get("relative_deadband"),
+                )
+            )
+        )
+    return schema
+
+
+def infer_schema(csv_path, sample_rows):
+    # only the first sample_rows rows are read, Ids that first appear later are not part of the schema.
+    # The sample may not show every value, so the attributes are doubles
+    data = pd.read_csv(csv_path, usecols=["Id"], nrows=sample_rows)
+    return [Attribute(name, "double", None) for name in sorted(data["Id"].dropna().astype(str).unique())]
+
+
+def device_schema(manifest_path, csv_path=None, sample_rows=0):
+    # the manifest if there is one, otherwise a sample of the data when sample_rows is set.
+    # None means the schema has to come from the data itself
+    if os.path.exists(manifest_path):
+        return load_schema(manifest_path)
+    if csv_path is not None and sample_rows > 0:
+        return infer_schema(csv_path, sample_rows)
+    return None
+
+
+def schema_names(schema):
+    # the Ids of the data that are written to the attributes of the schema
+    names = []
+    for attribute in schema:
+        names.extend(attribute.elements or [attribute.name])
+    return names
+
+
+def extend_schema(schema, attr_names, types=None):
+    # Ids found in the data but missing from the schema are added with their type in types, or as doubles
+    schema = list(schema or [])
+    known = set(schema_names(schema))
+    for attr_name in attr_names:
+        if attr_name not in known:
+            schema.append(Attribute(attr_name, (types or {}).get(attr_name, "double"), None))
+            known.add(attr_name)
+    return schema
+
+
+def schema_bindings(schema):
+    # maps each Id to its attribute, and to its position in the attribute for the elements of vectors
+    bindings = {}
+    for attribute in schema or []:
+        if attribute.elements:
+            for element, attr_name in enumerate(attribute.elements):
+                bindings[attr_name] = (attribute, element)
+        else:
+            bindings[attribute.name] = (attribute, None)
+    return bindings
+
+
+def reconcile_attributes(prim_spec, schema):
+    # add the attributes the prim is missing and leave the existing ones and their values alone, so
+    # live subscribers only see what actually changed. An existing attribute is never recreated, when
+    # its type differs from the schema it keeps its type and the values are converted to it. Attributes
+    # that are not in the schema are kept
+    added = 0
+    attributes = prim_spec.attributes
+    for attribute in schema:
+        value_type = _value_type(attribute.type)
+        attr = attributes.get(attribute.name)
+        if attr and attr.typeName != value_type:
+            if attr.typeName.isArray != value_type.isArray or (
+                attr.typeName.isArray and str(attr.typeName) not in _ARRAY_CASTS
+            ):
+                raise Exception(
+                    f"The attribute {attr.path} is a {attr.typeName} and can not hold the {attribute.type} values "
+                    "of the schema, remove it to recreate it."
+                )
+            print(f"Keeping the type {attr.typeName} of {attr.path}, the schema declares {attribute.type}")
+        if not attr:
+            attr = Sdf.AttributeSpec(prim_spec, attribute.name, value_type)
+            if not attr:
+                raise Exception(f"Could not define the attribute: {attribute.name}")
+            added += 1
+        if attribute.unit and attr.customData.get("unit") != attribute.unit:
+            attr.SetInfo("customData", dict(attr.customData, unit=attribute.unit))
+    return added
@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# pip install numpy
+# pip install pandas
+
+import numpy as np
+import pandas as pd
+from iot_common.playback import PlaybackPlan
+
+# the data starts at a fixed time, so runs with the same seed produce the same data
+START_TIME = "2023-01-01 00:00:00+00:00"
+# values generated at a time, a chunk of ticks of a device is at most this many values
+CHUNK_VALUES = 1 << 20
+
+
+def device_topic(prefix, index):
+    return f"{prefix}_{index:04d}"
+
+
+def attr_names(attributes):
+    return [f"attr_{i:04d}" for i in range(attributes)]
+
+
+def tick_times(start, end, rate, burst_every=0.0, burst_length=0.0, burst_factor=1):
+    # the offsets in seconds of the ticks in [start, end). For burst_length seconds out of every
+    # burst_every seconds the devices report burst_factor times as often
+    burst_factor = max(1, int(burst_factor))
+    fine_rate = rate * burst_factor
+    ticks = np.arange(int(np.ceil(start * fine_rate - 1e-9)), int(np.ceil(end * fine_rate - 1e-9)))
+    ts = ticks / fine_rate
+    keep = ticks % burst_factor == 0
+    if burst_every > 0 and burst_factor > 1:
+        keep |= (ts % burst_every) < burst_length
+    return ts[keep]
+
+
+def reported_rows(values):
+    # the rows of the reported values, in tick and attribute order, and the count of each tick
+    reported = ~np.isnan(values)
+    ticks, attr_indices = np.nonzero(reported)
+    return ticks, attr_indices.astype(np.int32), values[reported], reported.sum(axis=1)
+
+
+def _byte_matrix(strings):
+    # the strings as a (count, width) matrix of bytes, padded with zeros
+    strings = np.asarray(strings, dtype=np.bytes_)
+    return strings.view(np.uint8).reshape(len(strings), strings.dtype.itemsize)
+
+
+def _decimal_matrix(values, decimals):
+    # the values in fixed point notation as a (count, width) matrix of bytes, the leading zeros of
+    # the integer part are zero bytes so that they can be dropped with the other padding
+    scaled = np.round(np.abs(values) * 10.0**decimals).astype(np.int64)
+    digits = max(len(str(int(scaled.max()))) if len(scaled) else 1, decimals + 1)
+    powers = 10 ** np.arange(digits - 1, -1, -1, dtype=np.int64)
+    matrix = (scaled[:, None] // powers % 10 + ord("0")).astype(np.uint8)
+    integer = digits - decimals
+    leading = np.cumsum(matrix[:, : integer - 1] != ord("0"), axis=1) == 0
+    matrix[:, : integer - 1][leading] = 0
+    columns = np.zeros((len(values), digits + 2), np.uint8)
+    columns[values < 0, 0] = ord("-")
+    columns[:, 1 : integer + 1] = matrix[:, :integer]
+    columns[:, integer + 1] = ord(".")
+    columns[:, integer + 2 :] = matrix[:, integer:]
+    return columns
+
+
+def encode_csv_rows(timestamps, attr_names, ticks, attr_indices, values, decimals=6):
+    # the TimeStamp,Id,Value lines of the rows, built as one matrix of bytes rather than formatting
+    # each row. timestamps are the strings of the ticks and attr_names of the attributes
+    count = len(values)
+    separator = np.full((count, 1), ord(","), np.uint8)
+    lines = np.hstack(
+        [
+            _byte_matrix(timestamps)[ticks],
+            separator,
+            _byte_matrix(attr_names)[attr_indices],
+            separator,
+            _decimal_matrix(values, decimals),
+            np.full((count, 1), ord("\n"), np.uint8),
+        ]
+    )
+    return lines[lines != 0].tobytes()
+
+
+class SyntheticDevice:
+    # the values of one device. Each attribute has its own level around which it has gaussian noise,
+    # a linear drift and a random walk, with the noise, drift per second and walk per square root of
+    # a second scaled by the given amounts. Each value is reported with the probability report, the
+    # values that are not reported are NaN. The values are generated a chunk of ticks at a time and
+    # the walk carries over between chunks, so any duration can be streamed
+    def __init__(self, index, attributes, noise=1.0, drift=0.0, walk=0.0, report=1.0, seed=0):
+        self._rng = np.random.default_rng([seed, index])
+        self._report = report
+        self._noise = noise * self._rng.uniform(0.5, 1.5, attributes)
+        self._drift = drift * self._rng.normal(0.0, 1.0, attributes)
+        self._walk = walk
+        self._level = self._rng.uniform(0.0, 100.0, attributes)
+        self._last_ts = 0.0
+        self.attributes = attributes
+
+    def values(self, ts):
+        # a (ticks, attributes) array of the values at the given tick times
+        shape = (len(ts), self.attributes)
+        values = np.empty(shape)
+        if self._walk > 0 and len(ts) > 0:
+            steps = np.sqrt(np.diff(ts, prepend=self._last_ts))[:, None] * self._rng.normal(0.0, self._walk, shape)
+            values[:] = self._level + np.cumsum(steps, axis=0)
+            self._level = values[-1].copy()
+        else:
+            values[:] = self._level
+        values += ts[:, None] * self._drift
+        if self._noise.any():
+            values += self._rng.normal(0.0, 1.0, shape) * self._noise
+        if self._report < 1.0:
+            values[self._rng.random(shape) >= self._report] = np.nan
+        if len(ts) > 0:
+            self._last_ts = ts[-1]
+        return values
+
+
+def device_chunks(device, duration, rate, burst_every=0.0, burst_length=0.0, burst_factor=1):
+    # yields (ts, values) chunks of the ticks of a device for duration seconds
+    chunk_seconds = max(1.0 / rate, CHUNK_VALUES / (device.attributes * rate * max(1, burst_factor)))
+    start = 0.0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        ts = tick_times(start, end, rate, burst_every, burst_length, burst_factor)
+        yield ts, device.values(ts)
+        start = end
+
+
+def synthetic_plan(attributes, rate, duration, seed=0, index=0, **profile):
+    # the playback plan of a device, the profile is passed to SyntheticDevice
+    device = SyntheticDevice(index, attributes, seed=seed, **profile)
+    ts = tick_times(0.0, duration, rate)
+    ticks, attr_indices, values, counts = reported_rows(device.values(ts))
+    # the ticks at which nothing was reported are dropped
+    ts = ts[counts > 0]
+    offsets = np.append(0, np.cumsum(counts[counts > 0])).astype(np.int64)
+    times = pd.Timestamp(START_TIME) + pd.to_timedelta(ts, unit="s")
+    return PlaybackPlan(
+        attr_names(attributes), pd.DatetimeIndex(times), ts, offsets, attr_indices, np.ascontiguousarray(values)
+    )
+
+
+def synthetic_plans(devices, attributes, rate, duration, seed=0, prefix="device", **profile):
+    # one plan per device topic
+    return {
+        device_topic(prefix, d): synthetic_plan(attributes, rate, duration, seed, d, **profile) for d in range(devices)
+    }
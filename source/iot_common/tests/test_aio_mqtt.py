@@ -0,0 +1,234 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import asyncio
+import struct
+import pytest
+from iot_common.aio_mqtt import (
+    CONNACK,
+    PUBLISH,
+    LocalBroker,
+    MqttClient,
+    _encode_length,
+    _packet,
+    decode_publish,
+    encode_publish,
+    read_packet,
+    topic_matches,
+)
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+
+def read_bytes(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_packet(reader)
+
+    return run(read())
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+async def next_message(messages):
+    return await asyncio.wait_for(messages.__anext__(), 2)
+
+
+@pytest.mark.parametrize("length", [0, 1, 127, 128, 16383, 16384, 2097151, 2097152])
+def test_remaining_length(length):
+    encoded = _encode_length(length)
+    assert len(encoded) == 1 + (length > 127) + (length > 16383) + (length > 2097151)
+    assert read_bytes(_packet(PUBLISH, 0, b"x" * length)) == (PUBLISH, 0, b"x" * length)
+
+
+def test_malformed_remaining_length():
+    with pytest.raises(ValueError):
+        read_bytes(bytes([PUBLISH << 4, 0xFF, 0xFF, 0xFF, 0xFF, 0x01]))
+
+
+def test_publish_round_trip():
+    packet_type, flags, body = read_bytes(encode_publish("iot/A08", b"payload", retain=True))
+    assert packet_type == PUBLISH and flags == 1
+    assert decode_publish(flags, body) == ("iot/A08", b"payload", None)
+    # QoS 1 carries a packet id after the topic
+    body = struct.pack("!H", 7) + b"iot/A08" + struct.pack("!H", 42) + b"payload"
+    assert decode_publish(0x02, body) == ("iot/A08", b"payload", 42)
+
+
+@pytest.mark.parametrize(
+    "flags, body",
+    [
+        (0, b""),
+        (0, struct.pack("!H", 10) + b"iot"),
+        (0x02, struct.pack("!H", 3) + b"iot"),
+        (0, struct.pack("!H", 2) + b"\xff\xfe"),
+    ],
+)
+def test_malformed_publish(flags, body):
+    with pytest.raises(ValueError):
+        decode_publish(flags, body)
+
+
+@pytest.mark.parametrize(
+    "topic_filter, topic, matches",
+    [
+        ("iot/A08", "iot/A08", True),
+        ("iot/A08", "iot/A09", False),
+        ("iot/+", "iot/A08", True),
+        ("iot/+", "iot/A08/schema", False),
+        ("iot/+/schema", "iot/A08/schema", True),
+        ("iot/#", "iot/A08/schema", True),
+        ("iot/#", "iot", True),
+        ("#", "iot/A08", True),
+        ("iot/A08/schema", "iot/A08", False),
+    ],
+)
+def test_topic_matches(topic_filter, topic, matches):
+    assert topic_matches(topic_filter, topic) == matches
+
+
+def test_retained_delivery():
+    async def scenario():
+        broker = LocalBroker()
+        port = await broker.start()
+        publisher = MqttClient("publisher")
+        await publisher.connect("127.0.0.1", port)
+        await publisher.publish("iot/A08/schema", b"schema", retain=True)
+        await publisher.publish("iot/A08", b"not retained")
+        await wait_until(lambda: broker.published == 2)
+
+        # a later subscriber gets the retained message, and only that one
+        subscriber = MqttClient("subscriber")
+        await subscriber.connect("127.0.0.1", port)
+        await subscriber.subscribe("iot/#")
+        messages = subscriber.messages()
+        assert await next_message(messages) == ("iot/A08/schema", b"schema")
+
+        # an empty retained message clears it
+        await publisher.publish("iot/A08/schema", b"", retain=True)
+        assert await next_message(messages) == ("iot/A08/schema", b"")
+        late = MqttClient("late")
+        await late.connect("127.0.0.1", port)
+        await late.subscribe("iot/#")
+        await publisher.publish("iot/A08", b"live")
+        assert await next_message(late.messages()) == ("iot/A08", b"live")
+
+        for client in [publisher, subscriber, late]:
+            await client.disconnect()
+        await broker.close()
+
+    run(scenario())
+
+
+def test_subscribe_and_unsubscribe():
+    async def scenario():
+        broker = LocalBroker()
+        port = await broker.start()
+        client = MqttClient("client")
+        await client.connect("127.0.0.1", port)
+        await client.subscribe("iot/A08")
+        await client.subscribe("iot/A09")
+        await wait_until(lambda: sum(map(len, broker._sessions.values())) == 2)
+        messages = client.messages()
+        await client.publish("iot/A08", b"1")
+        assert await next_message(messages) == ("iot/A08", b"1")
+
+        await client.unsubscribe("iot/A08")
+        await wait_until(lambda: sum(map(len, broker._sessions.values())) == 1)
+        await client.publish("iot/A08", b"2")
+        await client.publish("iot/A09", b"3")
+        assert await next_message(messages) == ("iot/A09", b"3")
+        assert broker.delivered == 2
+
+        await client.disconnect()
+        await broker.close()
+
+    run(scenario())
+
+
+def test_disconnect():
+    async def scenario():
+        broker = LocalBroker()
+        port = await broker.start()
+        client = MqttClient("client")
+        await client.connect("127.0.0.1", port)
+        await client.subscribe("iot/#")
+        await wait_until(lambda: len(broker._sessions) == 1)
+        await client.disconnect()
+        await wait_until(lambda: len(broker._sessions) == 0)
+
+        # closing the broker ends the messages of its clients
+        client = MqttClient("client")
+        await client.connect("127.0.0.1", port)
+        messages = client.messages()
+        await broker.close()
+        with pytest.raises(StopAsyncIteration):
+            await next_message(messages)
+        await client.disconnect()
+
+    run(scenario())
+
+
+def test_malformed_packets_from_the_broker():
+    async def scenario():
+        async def handle(reader, writer):
+            await read_packet(reader)
+            writer.write(_packet(CONNACK, 0, b"\x00\x00"))
+            # a publish with a broken topic is dropped, the valid one after it is delivered
+            writer.write(_packet(PUBLISH, 0, struct.pack("!H", 10) + b"iot"))
+            writer.write(encode_publish("iot/A08", b"valid"))
+            # then the connection is reset
+            await writer.drain()
+            writer.transport.abort()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        client = MqttClient("client")
+        await client.connect("127.0.0.1", server.sockets[0].getsockname()[1])
+        received = [message async for message in client.messages()]
+        assert received == [("iot/A08", b"valid")]
+        await client.disconnect()
+        server.close()
+        await server.wait_closed()
+
+    run(scenario())
+
+
+def test_broker_closes_malformed_connections():
+    async def scenario():
+        broker = LocalBroker()
+        port = await broker.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(_packet(1, 0, b"connect"))
+        await read_packet(reader)
+        writer.write(bytes([PUBLISH << 4, 0xFF, 0xFF, 0xFF, 0xFF, 0x01]))
+        assert await reader.read() == b""
+        writer.close()
+        await broker.close()
+
+    run(scenario())
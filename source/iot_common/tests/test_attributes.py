@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+from pxr import Sdf
+from iot_common.attributes import AttributeIndex, ValueWriter
+
+
+def make_layer(names):
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim_spec = Sdf.CreatePrimInLayer(layer, "/iot/A08")
+    for name in names:
+        Sdf.AttributeSpec(prim_spec, name, Sdf.ValueTypeNames.Double)
+    return layer, prim_spec
+
+
+def write(index, writer, positions, values):
+    with index.writing(), Sdf.ChangeBlock():
+        writer.write(positions, values)
+
+
+def test_write_values():
+    layer, _ = make_layer(["Velocity", "Temperature"])
+    index = AttributeIndex(layer)
+    writer = ValueWriter(index, ["/iot/A08.Velocity", "/iot/A08.Temperature"], {})
+    write(index, writer, [0, 1], [1.5, 20.0])
+    assert layer.GetAttributeAtPath("/iot/A08.Velocity").default == 1.5
+    assert layer.GetAttributeAtPath("/iot/A08.Temperature").default == 20.0
+    # our own writes do not make the index dirty
+    assert index.refresh() == 0
+    index.close()
+
+
+def test_property_removed_mid_playback():
+    layer, prim_spec = make_layer(["Velocity", "Temperature"])
+    index = AttributeIndex(layer)
+    writer = ValueWriter(index, ["/iot/A08.Velocity", "/iot/A08.Temperature"], {})
+    write(index, writer, [0, 1], [1.0, 20.0])
+
+    # another client removes a property between two writes, no lookup runs in between
+    prim_spec.RemoveProperty(prim_spec.attributes["Temperature"])
+    write(index, writer, [0, 1], [2.0, 21.0])
+    assert index.generation == 1
+    assert layer.GetAttributeAtPath("/iot/A08.Velocity").default == 2.0
+    assert not layer.GetAttributeAtPath("/iot/A08.Temperature")
+    assert index.find("/iot/A08", "Temperature") is None
+
+    # the values are written again once the property is back and the writer resolves again
+    Sdf.AttributeSpec(prim_spec, "Temperature", Sdf.ValueTypeNames.Double)
+    index.invalidate()
+    write(index, writer, [0, 1], [3.0, 22.0])
+    assert layer.GetAttributeAtPath("/iot/A08.Temperature").default == 22.0
+    index.close()
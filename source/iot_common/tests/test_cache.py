@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from iot_common.cache import CACHE_VERSION, ColumnarWriter, cache_path, columnar_path, load_plan
+
+ROWS = [
+    ("2023-01-01 10:00:00", "Velocity", 1.0),
+    ("2023-01-01 10:00:00", "Temperature", 20.0),
+    ("2023-01-01 10:00:01", "Velocity", 2.0),
+]
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=["TimeStamp", "Id", "Value"]).to_csv(path, index=False)
+    return str(path)
+
+
+def is_cached(plan):
+    # a plan loaded from the cache is memory mapped
+    return isinstance(plan.values, np.memmap)
+
+
+def test_cache_is_reused(tmp_path):
+    csv_path = write_csv(tmp_path / "data.csv", ROWS)
+    plan = load_plan(csv_path)
+    assert not is_cached(plan)
+    assert os.path.isdir(cache_path(csv_path))
+
+    cached = load_plan(csv_path)
+    assert is_cached(cached)
+    assert cached.attr_names == plan.attr_names
+    assert list(cached.times) == list(plan.times)
+    assert np.array_equal(cached.values, plan.values)
+    assert not is_cached(load_plan(csv_path, use_cache=False))
+
+
+def test_cache_is_rebuilt_when_the_data_changes(tmp_path):
+    csv_path = write_csv(tmp_path / "data.csv", ROWS)
+    load_plan(csv_path)
+
+    # same size, other content. The modification time is moved on in case the file system is coarse
+    stat = os.stat(csv_path)
+    write_csv(csv_path, ROWS[:2] + [("2023-01-01 10:00:01", "Velocity", 3.0)])
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    plan = load_plan(csv_path)
+    assert not is_cached(plan)
+    assert list(plan.values) == [1.0, 20.0, 3.0]
+    assert list(load_plan(csv_path).values) == [1.0, 20.0, 3.0]
+
+    # another size
+    write_csv(csv_path, ROWS[:1])
+    assert list(load_plan(csv_path).values) == [1.0]
+
+
+def test_touched_file_keeps_the_cache(tmp_path):
+    csv_path = write_csv(tmp_path / "data.csv", ROWS)
+    load_plan(csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert is_cached(load_plan(csv_path))
+    with open(os.path.join(cache_path(csv_path), "meta.json")) as f:
+        assert json.load(f)["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+
+def test_cache_of_another_version_is_rebuilt(tmp_path):
+    csv_path = write_csv(tmp_path / "data.csv", ROWS)
+    load_plan(csv_path)
+    meta_path = os.path.join(cache_path(csv_path), "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["version"] = CACHE_VERSION + 1
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert not is_cached(load_plan(csv_path))
+    assert is_cached(load_plan(csv_path))
+
+
+def test_columnar_data(tmp_path):
+    csv_path = str(tmp_path / "data.csv")
+    writer = ColumnarWriter(columnar_path(csv_path), ["Temperature", "Velocity"])
+    times = pd.DatetimeIndex(["2023-01-01 10:00:00", "2023-01-01 10:00:01"], tz="UTC")
+    writer.write(times[:1], [2], np.array([1, 0], np.int32), np.array([1.0, 20.0]))
+    writer.write(times[1:], [1], np.array([1], np.int32), np.array([2.0]))
+    writer.close()
+
+    # without the CSV file the columnar data is loaded
+    plan = load_plan(csv_path)
+    assert plan.attr_names == ["Temperature", "Velocity"]
+    assert list(plan.ts) == [0.0, 1.0]
+    assert list(plan.offsets) == [0, 2, 3]
+    assert list(plan.times) == list(times)
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import pytest
+from iot_common.codec import (
+    MAX_PACKED_ATTRIBUTES,
+    PayloadDecoder,
+    encode_json,
+    encode_packed,
+    encode_schema,
+    schema_id,
+)
+
+ATTR_NAMES = ["_ts", "Velocity", "Temperature"]
+
+
+def schema_decoder():
+    decoder = PayloadDecoder()
+    decoder.on_schema(encode_schema(ATTR_NAMES))
+    return decoder
+
+
+def test_packed_round_trip():
+    payload = encode_packed(schema_id(ATTR_NAMES), [0, 2], [1.5, 20.25])
+    assert schema_decoder().decode(payload) == {"_ts": 1.5, "Temperature": 20.25}
+
+
+def test_json_payload():
+    assert PayloadDecoder().decode(encode_json({"Velocity": 2.0})) == {"Velocity": 2.0}
+    with pytest.raises(ValueError):
+        PayloadDecoder().decode(b"[1, 2]")
+
+
+def test_unknown_schema():
+    with pytest.raises(ValueError):
+        PayloadDecoder().decode(encode_packed(schema_id(ATTR_NAMES), [0], [1.0]))
+
+
+def test_truncated_payload():
+    payload = encode_packed(schema_id(ATTR_NAMES), [0, 1], [1.0, 2.0])
+    for size in [1, 3, len(payload) - 1]:
+        with pytest.raises(ValueError):
+            schema_decoder().decode(payload[:size])
+
+
+def test_index_beyond_schema():
+    with pytest.raises(ValueError):
+        schema_decoder().decode(encode_packed(schema_id(ATTR_NAMES), [0, 3], [1.0, 2.0]))
+
+
+def test_schema_size_limit():
+    encode_schema([str(i) for i in range(MAX_PACKED_ATTRIBUTES)])
+    with pytest.raises(ValueError):
+        encode_schema([str(i) for i in range(MAX_PACKED_ATTRIBUTES + 1)])
+    with pytest.raises(ValueError):
+        encode_packed(0, [MAX_PACKED_ATTRIBUTES], [1.0])
@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import math
+from iot_common.filters import DeadbandFilter
+from iot_common.schema import Attribute
+
+ATTR_PATHS = ["/iot/A08.Velocity", "/iot/A08.Temperature"]
+
+
+def test_only_changed_values_are_kept():
+    value_filter = DeadbandFilter(ATTR_PATHS, {}, heartbeat=0)
+    assert value_filter.apply([0, 1], [1.0, 20.0], 0.0) == ([0, 1], [1.0, 20.0])
+    assert value_filter.apply([0, 1], [1.0, 20.5], 1.0) == ([1], [20.5])
+    assert value_filter.apply([0, 0], [1.0, 1.0], 2.0) == ([], [])
+    assert value_filter.ratios() == {"/iot/A08.Velocity": 0.75, "/iot/A08.Temperature": 0.0}
+
+
+def test_nan_and_bool_values():
+    value_filter = DeadbandFilter(ATTR_PATHS, {}, deadband=1.0, heartbeat=0)
+    value_filter.apply([0, 1], [1.0, True], 0.0)
+    positions, values = value_filter.apply([0], [math.nan], 1.0)
+    assert positions == [0] and math.isnan(values[0])
+    assert value_filter.apply([0], [math.nan], 2.0) == ([], [])
+    # a bool is never within the deadband of another value
+    assert value_filter.apply([1], [False], 3.0) == ([1], [False])
+
+
+def test_deadbands():
+    value_filter = DeadbandFilter(ATTR_PATHS, {}, deadband=0.5, relative_deadband=0.1, heartbeat=0)
+    value_filter.apply([0, 1], [1.0, 100.0], 0.0)
+    # the deadband is the larger of the absolute and the relative one, from the last kept value
+    assert value_filter.apply([0, 1], [1.4, 109.0], 1.0) == ([], [])
+    assert value_filter.apply([0, 1], [1.6, 111.0], 2.0) == ([0, 1], [1.6, 111.0])
+    assert value_filter.apply([0], [1.2], 3.0) == ([], [])
+
+
+def test_schema_deadbands_override_the_defaults():
+    schemas = {
+        "/iot/A08": [Attribute("Velocity", "double", None, deadband=2.0), Attribute("Temperature", "double", None)]
+    }
+    value_filter = DeadbandFilter(ATTR_PATHS, schemas, deadband=0.5, heartbeat=0)
+    value_filter.apply([0, 1], [1.0, 20.0], 0.0)
+    assert value_filter.apply([0, 1], [2.5, 20.6], 1.0) == ([1], [20.6])
+
+
+def test_heartbeat():
+    value_filter = DeadbandFilter(ATTR_PATHS, {}, heartbeat=10.0)
+    value_filter.apply([0], [1.0], 0.0)
+    assert value_filter.apply([0], [1.0], 9.0) == ([], [])
+    # an unchanged value is kept once the heartbeat has passed since the last kept value
+    assert value_filter.apply([0], [1.0], 10.0) == ([0], [1.0])
+    assert value_filter.apply([0], [1.0], 15.0) == ([], [])
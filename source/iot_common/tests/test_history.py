@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+from pxr import Sdf
+from iot_common.history import HistoryRecorder
+
+
+class MemoryRecorder(HistoryRecorder):
+    # keeps the saved layers instead of writing them to Nucleus
+    def __init__(self, *args, **kwargs):
+        self.saves = []
+        super().__init__("history.usda", *args, **kwargs)
+
+    def _write(self, content):
+        self.saves.append(content)
+        return None
+
+
+def make_attrs():
+    # the specs do not keep the layer alive, so it is returned as well
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim_spec = Sdf.CreatePrimInLayer(layer, "/iot/A08")
+    attrs = [Sdf.AttributeSpec(prim_spec, name, Sdf.ValueTypeNames.Double) for name in ["Velocity", "Temperature"]]
+    return layer, attrs
+
+
+def sample_times(recorder, path):
+    return list(recorder.layer.ListTimeSamplesForPath(path))
+
+
+def test_downsampling_keeps_the_latest_value():
+    layer, (velocity, _) = make_attrs()
+    recorder = MemoryRecorder(rate=1.0, save_interval=3600)
+    for time_code, value in [(0.0, 1.0), (0.5, 2.0), (0.9, 3.0), (1.2, 4.0), (1.5, 5.0), (2.5, 6.0)]:
+        recorder.record(time_code, [(velocity, value)])
+    assert sample_times(recorder, velocity.path) == [0.0, 1.2, 2.5]
+    assert recorder.layer.QueryTimeSample(velocity.path, 1.2) == 4.0
+    # the values in between are sampled on close
+    recorder.record(3.0, [(velocity, 7.0)])
+    recorder.close()
+    assert recorder.layer.QueryTimeSample(velocity.path, 3.0) == 7.0
+    assert len(recorder.saves) == 1
+
+
+def test_ring_buffer_keeps_max_samples():
+    layer, (velocity, temperature) = make_attrs()
+    recorder = MemoryRecorder(rate=0, max_samples=3, save_interval=3600)
+    for time_code in range(6):
+        recorder.record(float(time_code), [(velocity, float(time_code))])
+    recorder.record(6.0, [(temperature, 1.0)])
+    assert sample_times(recorder, velocity.path) == [3.0, 4.0, 5.0]
+    assert sample_times(recorder, temperature.path) == [6.0]
+    assert recorder.evicted == 3
+    recorder.close()
+
+
+def test_ring_buffer_keeps_max_age():
+    layer, (velocity, temperature) = make_attrs()
+    recorder = MemoryRecorder(rate=0, max_samples=0, max_age=10.0, save_interval=3600)
+    for time_code in [0.0, 5.0, 10.0]:
+        recorder.record(time_code, [(velocity, time_code)])
+    # the samples of attributes that stopped reporting age out as well
+    recorder.record(16.0, [(temperature, 1.0)])
+    assert sample_times(recorder, velocity.path) == [10.0]
+    recorder.close()
+
+
+def test_samples_are_never_written_back_in_time():
+    layer, (velocity, _) = make_attrs()
+    recorder = MemoryRecorder(rate=0, save_interval=3600)
+    recorder.record(5.0, [(velocity, 1.0)])
+    recorder.record(3.0, [(velocity, 2.0)])
+    recorder.close()
+    assert sample_times(recorder, velocity.path) == [5.0]
+    assert recorder.layer.QueryTimeSample(velocity.path, 5.0) == 2.0
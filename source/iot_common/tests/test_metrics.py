@@ -0,0 +1,49 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+from iot_common.metrics import Metrics
+
+
+def test_buckets_can_be_a_list():
+    metrics = Metrics([0.1, 1.0])
+    metrics.observe("latency", 0.05)
+    metrics.observe("latency", 0.5)
+    metrics.observe("latency", 5.0)
+    assert metrics.quantile("latency", 0.5) == 1.0
+    assert metrics.quantile("latency", 1.0) == float("inf")
+    text = metrics.to_prometheus()
+    assert 'iot_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'iot_latency_seconds_bucket{le="+Inf"} 3' in text
+
+    metrics.reset([0.5])
+    metrics.observe("latency", 0.2)
+    assert 'iot_latency_seconds_bucket{le="0.5"} 1' in metrics.to_prometheus()
+
+
+def test_prometheus_is_sorted():
+    metrics = Metrics()
+    metrics.count("values")
+    metrics.count("messages", 2)
+    metrics.add_time("parse", 0.5)
+    text = metrics.to_prometheus()
+    assert text.index("iot_messages_total 2") < text.index("iot_values_total 1")
+    assert 'iot_stage_seconds_max{stage="parse"} 0.5' in text
@@ -0,0 +1,189 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from iot_common.playback import (
+    Batch,
+    MergedStream,
+    compile_plan,
+    load_topic_data,
+    merge_plans,
+    seek_batches,
+    stream_batches,
+)
+
+ROWS = [
+    ("2023-01-01 10:00:00.250", "Velocity", 1.0),
+    ("2023-01-01 10:00:00.750", "Temperature", 20.0),
+    ("2023-01-01 10:00:02.000", "Velocity", 2.0),
+    ("2023-01-01 10:00:01.000", "Velocity", 1.5),
+    ("2023-01-01 10:00:02.000", "Temperature", 21.0),
+    ("2023-01-01 10:00:02.000", "Velocity", 2.5),
+    ("2023-01-01 10:00:05.000", "Temperature", 22.0),
+]
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=["TimeStamp", "Id", "Value"]).to_csv(path, index=False)
+    return str(path)
+
+
+def unpack(batches, attr_names):
+    # (ts, [(name, value), ...], paced) of each batch
+    return [
+        (
+            batch.ts,
+            [(attr_names[attr_index], value) for attr_index, value in zip(batch.attr_indices, batch.values)],
+            batch.paced,
+        )
+        for batch in batches
+    ]
+
+
+def test_plan_groups_by_second(tmp_path):
+    plan = compile_plan(load_topic_data(write_csv(tmp_path / "data.csv", ROWS)))
+    assert plan.attr_names == ["Temperature", "Velocity"]
+    assert list(plan.ts) == [0.0, 1.0, 2.0, 5.0]
+    # the rows of a timestamp keep their file order
+    assert unpack(plan.batches(), plan.attr_names) == [
+        (0.0, [("Velocity", 1.0), ("Temperature", 20.0)], True),
+        (1.0, [("Velocity", 1.5)], True),
+        (2.0, [("Velocity", 2.0), ("Temperature", 21.0), ("Velocity", 2.5)], True),
+        (5.0, [("Temperature", 22.0)], True),
+    ]
+
+
+def test_plan_seek(tmp_path):
+    plan = compile_plan(load_topic_data(write_csv(tmp_path / "data.csv", ROWS)))
+    # the catch-up batch holds the latest value of every attribute before the seek time
+    batches = unpack(plan.batches("2"), plan.attr_names)
+    assert batches[0] == (1.0, [("Temperature", 20.0), ("Velocity", 1.5)], False)
+    assert [ts for ts, _, _ in batches[1:]] == [2.0, 5.0]
+    assert unpack(plan.batches("2023-01-01 10:00:03"), plan.attr_names)[0] == (
+        2.0,
+        [("Temperature", 21.0), ("Velocity", 2.5)],
+        False,
+    )
+    # past the end only the catch-up batch is left
+    assert [batch.paced for batch in plan.batches("10")] == [False]
+
+
+def test_empty_plan(tmp_path):
+    plan = compile_plan(load_topic_data(write_csv(tmp_path / "data.csv", [])))
+    assert len(plan) == 0
+    assert list(plan.batches()) == []
+    assert np.array_equal(plan.offsets, [0])
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 4, 100])
+def test_stream_matches_plan(tmp_path, chunksize):
+    # the groups that span chunk boundaries are stitched back together
+    csv_path = write_csv(tmp_path / "data.csv", sorted(ROWS, key=lambda row: row[0]))
+    plan = compile_plan(load_topic_data(csv_path))
+    for seek in ["0", "2", "10"]:
+        streamed = stream_batches(csv_path, plan.attr_names, seek, chunksize)
+        assert unpack(streamed, plan.attr_names) == unpack(plan.batches(seek), plan.attr_names)
+
+
+def test_stream_skips_unknown_ids(tmp_path):
+    csv_path = write_csv(tmp_path / "data.csv", sorted(ROWS, key=lambda row: row[0]))
+    streamed = unpack(stream_batches(csv_path, ["Velocity"], "0", 2), ["Velocity"])
+    assert streamed == [
+        (0.0, [("Velocity", 1.0)], True),
+        (1.0, [("Velocity", 1.5)], True),
+        (2.0, [("Velocity", 2.0), ("Velocity", 2.5)], True),
+    ]
+
+
+def test_stream_requires_ordered_file(tmp_path):
+    # rows may be out of order within a chunk, but not before a timestamp that was already played
+    rows = [
+        ("2023-01-01 10:00:00.000", "Velocity", 1.0),
+        ("2023-01-01 10:00:02.000", "Velocity", 2.0),
+        ("2023-01-01 10:00:03.000", "Velocity", 3.0),
+        ("2023-01-01 10:00:00.500", "Velocity", 4.0),
+    ]
+    csv_path = write_csv(tmp_path / "data.csv", rows)
+    with pytest.raises(Exception, match="not ordered by TimeStamp"):
+        list(stream_batches(csv_path, ["Velocity"], "0", 2))
+
+
+def test_seek_batches():
+    start = pd.Timestamp("2023-01-01 10:00:00", tz="UTC")
+    batches = [
+        Batch(start + pd.Timedelta(seconds=ts), ts, np.array(indices, np.int32), np.array(values), True)
+        for ts, indices, values in [(0.0, [0, 1], [1.0, 2.0]), (1.0, [0, 0], [3.0, 4.0]), (2.0, [1], [5.0])]
+    ]
+    assert list(seek_batches(iter(batches), 3)) == batches
+
+    seeked = list(seek_batches(iter(batches), 3, "1.5"))
+    catch_up = seeked[0]
+    assert (catch_up.ts, catch_up.paced) == (1.0, False)
+    assert list(catch_up.attr_indices) == [0, 1] and list(catch_up.values) == [4.0, 2.0]
+    assert seeked[1:] == batches[2:]
+
+    # seeking past the end yields only the catch-up batch
+    seeked = list(seek_batches(iter(batches), 3, "2023-01-01 10:00:10"))
+    assert len(seeked) == 1 and list(seeked[0].values) == [4.0, 5.0]
+
+
+DEVICE_ROWS = {
+    "A08": [
+        ("2023-01-01 10:00:01.000", "Velocity", 1.0),
+        ("2023-01-01 10:00:03.000", "Velocity", 3.0),
+    ],
+    "A09": [
+        ("2023-01-01 10:00:00.000", "Velocity", 10.0),
+        ("2023-01-01 10:00:03.000", "Velocity", 30.0),
+        ("2023-01-01 10:00:04.000", "Velocity", 40.0),
+    ],
+}
+
+
+def test_merge_plans(tmp_path):
+    plans = {
+        topic: compile_plan(load_topic_data(write_csv(tmp_path / f"{topic}.csv", rows)))
+        for topic, rows in DEVICE_ROWS.items()
+    }
+    merged = merge_plans(plans)
+    assert merged.attr_names == ["A08.Velocity", "A08._ts", "A09.Velocity", "A09._ts"]
+    # ordered by time, devices with data at the same time are in topic order with their own _ts offset
+    assert unpack(merged.batches(), merged.attr_names) == [
+        (0.0, [("A09.Velocity", 10.0), ("A09._ts", 0.0)], True),
+        (1.0, [("A08.Velocity", 1.0), ("A08._ts", 0.0)], True),
+        (3.0, [("A08.Velocity", 3.0), ("A08._ts", 2.0), ("A09.Velocity", 30.0), ("A09._ts", 3.0)], True),
+        (4.0, [("A09.Velocity", 40.0), ("A09._ts", 4.0)], True),
+    ]
+    assert len(merge_plans({})) == 0
+
+
+@pytest.mark.parametrize("seek", ["0", "2", "10"])
+def test_merged_stream_matches_merge_plans(tmp_path, seek):
+    csv_paths = {topic: write_csv(tmp_path / f"{topic}.csv", rows) for topic, rows in DEVICE_ROWS.items()}
+    merged = merge_plans({topic: compile_plan(load_topic_data(csv_path)) for topic, csv_path in csv_paths.items()})
+    stream = MergedStream(
+        {topic: (["Velocity"], stream_batches(csv_path, ["Velocity"], "0", 1)) for topic, csv_path in csv_paths.items()}
+    )
+    assert stream.attr_names == merged.attr_names
+    assert unpack(stream.batches(seek), stream.attr_names) == unpack(merged.batches(seek), merged.attr_names)
@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import math
+import pytest
+from pxr import Sdf
+from iot_common.attributes import AttributeIndex, ValueWriter
+from iot_common.schema import Attribute, reconcile_attributes, value_cast, vector_cast
+
+
+def test_int_cast():
+    cast = value_cast("int")
+    assert cast(2.6) == 3
+    assert cast(math.nan) == 0
+    assert cast(math.inf) == (1 << 31) - 1
+    assert cast(-math.inf) == -(1 << 31)
+
+
+def test_bool_cast():
+    cast = value_cast("bool")
+    assert cast(" True") is True
+    assert cast("off") is False
+    assert cast(1.0) is True
+    assert cast(0) is False
+    for value in ("maybe", "", 2.0, math.nan, None):
+        with pytest.raises(ValueError):
+            cast(value)
+
+
+def test_schema_rejects_unsupported_vectors():
+    with pytest.raises(Exception):
+        vector_cast("token[]")
+    assert vector_cast("double[]") is None
+
+
+def test_vector_is_written_as_its_type():
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim_spec = Sdf.CreatePrimInLayer(layer, "/iot/A08")
+    schema = [
+        Attribute("Counts", "int[]", None, ["Count_0", "Count_1"]),
+        Attribute("Switches", "bool[]", None, ["Switch_0", "Switch_1"]),
+        Attribute("Valve", "bool", None),
+    ]
+    reconcile_attributes(prim_spec, schema)
+    index = AttributeIndex(layer)
+    attr_paths = ["/iot/A08.Count_0", "/iot/A08.Count_1", "/iot/A08.Switch_0", "/iot/A08.Switch_1", "/iot/A08.Valve"]
+    writer = ValueWriter(index, attr_paths, {"/iot/A08": schema})
+    with index.writing(), Sdf.ChangeBlock():
+        writer.write([0, 1, 2, 3, 4], [2.6, math.nan, 1.0, 0.0, "yes"])
+    assert list(prim_spec.attributes["Counts"].default) == [3, 0]
+    assert list(prim_spec.attributes["Switches"].default) == [True, False]
+    assert prim_spec.attributes["Valve"].default is True
+
+    # a value that is not a bool is rejected and the attribute keeps its value
+    with index.writing(), Sdf.ChangeBlock():
+        writer.write([4], ["unknown"])
+    assert prim_spec.attributes["Valve"].default is True
+    index.close()
+
+
+def test_existing_type_is_kept():
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    prim_spec = Sdf.CreatePrimInLayer(layer, "/iot/A08")
+    velocity = Sdf.AttributeSpec(prim_spec, "Velocity", Sdf.ValueTypeNames.Double)
+    velocity.default = 1.5
+
+    added = reconcile_attributes(prim_spec, [Attribute("Velocity", "int", None), Attribute("Count", "int", None)])
+    assert added == 1
+    assert prim_spec.attributes["Velocity"].typeName == Sdf.ValueTypeNames.Double
+    assert prim_spec.attributes["Velocity"].default == 1.5
+    assert prim_spec.attributes["Count"].typeName == Sdf.ValueTypeNames.Int
+
+    # the values are converted to the type of the attribute in the layer, not the declared one
+    index = AttributeIndex(layer)
+    schemas = {"/iot/A08": [Attribute("Velocity", "int", None), Attribute("Count", "int", None)]}
+    writer = ValueWriter(index, ["/iot/A08.Velocity", "/iot/A08.Count"], schemas)
+    with index.writing(), Sdf.ChangeBlock():
+        writer.write([0, 1], [2.25, math.nan])
+    assert prim_spec.attributes["Velocity"].default == 2.25
+    assert prim_spec.attributes["Count"].default == 0
+    index.close()
@@ -0,0 +1,190 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import asyncio
+import queue
+import threading
+import time
+from iot_common.metrics import registry
+
+
+class CoalescingWriter:
+    # moves decoding and USD writes off the thread that receives the messages. Messages are put on a
+    # bounded queue, when it is full the oldest message is dropped. A writer thread drains the queue
+    # in windows, keeps the latest value of each attribute seen in the window and applies them with
+    # a single call to apply, which is expected to write one ChangeBlock and call live_process() once.
+    # decode turns a message into a dict of attribute name to value. The latency from receiving the
+    # oldest message of a window to the end of apply is recorded in the metrics registry
+    def __init__(self, decode, apply, window=0.02, maxsize=10000, report_interval=10.0):
+        self._decode = decode
+        self._apply = apply
+        self._window = window
+        self._report_interval = report_interval
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.written = 0
+        self.windows = 0
+        self.errors = 0
+        self.max_depth = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="CoalescingWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, message):
+        # called from the network thread, never blocks
+        self.received += 1
+        registry.count("messages_received")
+        item = (time.monotonic(), message)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _collect(self, pending, item):
+        received_at, message = item
+        start = time.perf_counter()
+        try:
+            values = self._decode(message)
+        except Exception as e:
+            self.errors += 1
+            print(f"Could not decode message: {e}")
+            return received_at
+        registry.add_time("parse", time.perf_counter() - start)
+        self._coalesce(pending, values)
+        return received_at
+
+    def _coalesce(self, pending, values):
+        for name, value in values.items():
+            if name in pending:
+                self.coalesced += 1
+            pending[name] = value
+
+    def _write(self, pending, received_at):
+        if len(pending) == 0:
+            return
+        try:
+            self._apply(pending)
+            self.written += len(pending)
+            self.windows += 1
+            registry.observe("latency", time.monotonic() - received_at)
+        except Exception as e:
+            self.errors += 1
+            print(f"Could not write to the live layer: {e}")
+
+    def _run(self):
+        last_report = time.monotonic()
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                message = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # the window opens with the first message, so no value waits longer than the window
+            pending = {}
+            received_at = self._collect(pending, message)
+            deadline = time.monotonic() + self._window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._collect(pending, self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(pending, received_at)
+
+            now = time.monotonic()
+            if self._report_interval > 0 and now - last_report >= self._report_interval:
+                print(self.report())
+                last_report = now
+
+    async def run_async(self, values_queue):
+        # asyncio counterpart of the writer thread, values_queue is an asyncio.Queue of
+        # (time.monotonic() when received, decoded dict) and None ends the loop. Sleeping for the window
+        # lets the queue fill up, so its bound applies backpressure to the stages in front of it
+        self._queue = values_queue
+        last_report = time.monotonic()
+        done = False
+        while not done:
+            item = await values_queue.get()
+            if item is None:
+                break
+            self.received += 1
+            received_at, values = item
+            pending = {}
+            self._coalesce(pending, values)
+            await asyncio.sleep(self._window)
+            self.max_depth = max(self.max_depth, values_queue.qsize())
+            while not values_queue.empty():
+                item = values_queue.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                self.received += 1
+                self._coalesce(pending, item[1])
+
+            self._write(pending, received_at)
+            now = time.monotonic()
+            if self._report_interval > 0 and now - last_report >= self._report_interval:
+                print(self.report())
+                last_report = now
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "windows": self.windows,
+            "errors": self.errors,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (
+            f"received: {stats['received']} dropped: {stats['dropped']} coalesced: {stats['coalesced']} "
+            f"written: {stats['written']} windows: {stats['windows']} errors: {stats['errors']} "
+            f"queue depth: {stats['queue_depth']} max: {stats['max_queue_depth']}"
+        )
@@ -0,0 +1,213 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+# pip install numpy
+# pip install pandas
+
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from iot_common.aio_mqtt import LocalBroker, MqttClient
+from iot_common.cache import ColumnarWriter, columnar_path
+from iot_common.codec import encode_json, encode_packed, encode_schema, schema_id, schema_topic
+from iot_common.synthetic import (
+    CHUNK_VALUES,
+    START_TIME,
+    SyntheticDevice,
+    attr_names,
+    device_chunks,
+    device_topic,
+    encode_csv_rows,
+    reported_rows,
+    tick_times,
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONTENT_DIR = Path(SCRIPT_DIR).resolve().parents[1].joinpath("content")
+
+# csv or columnar files in OUTPUT_DIR, or a live mqtt stream
+FORMAT = os.environ.get("IOT_GEN_FORMAT", "csv")
+OUTPUT_DIR = os.environ.get("IOT_GEN_OUTPUT", str(CONTENT_DIR))
+# the topics of the devices are <prefix>_0000, <prefix>_0001, ...
+PREFIX = os.environ.get("IOT_GEN_PREFIX", "device")
+DEVICES = int(os.environ.get("IOT_GEN_DEVICES", "1000"))
+ATTRIBUTES = int(os.environ.get("IOT_GEN_ATTRIBUTES", "20"))
+# reports of each device per second, and the seconds of data
+RATE = float(os.environ.get("IOT_GEN_RATE", "1"))
+DURATION = float(os.environ.get("IOT_GEN_DURATION", "3600"))
+# the value profile: gaussian noise, linear drift per second and random walk per square root second
+NOISE = float(os.environ.get("IOT_GEN_NOISE", "1"))
+DRIFT = float(os.environ.get("IOT_GEN_DRIFT", "0"))
+WALK = float(os.environ.get("IOT_GEN_WALK", "0"))
+# the probability that a device reports an attribute in a report
+REPORT = float(os.environ.get("IOT_GEN_REPORT", "1"))
+# for burst_length seconds out of every burst_every seconds the devices report burst_factor times as often
+BURST_EVERY = float(os.environ.get("IOT_GEN_BURST_EVERY", "0"))
+BURST_LENGTH = float(os.environ.get("IOT_GEN_BURST_LENGTH", "0"))
+BURST_FACTOR = int(os.environ.get("IOT_GEN_BURST_FACTOR", "1"))
+SEED = int(os.environ.get("IOT_GEN_SEED", "0"))
+# the live stream is published in real-time scaled by speed, or as fast as possible
+SPEED = os.environ.get("IOT_GEN_SPEED", "1")
+MQTT_BROKER = os.environ.get("IOT_MQTT_BROKER", "localhost:1883")
+LOCAL_BROKER = os.environ.get("IOT_LOCAL_BROKER", "0") == "1"
+PAYLOAD_FORMAT = os.environ.get("IOT_PAYLOAD_FORMAT", "json")
+
+PROFILE = {"noise": NOISE, "drift": DRIFT, "walk": WALK, "report": REPORT}
+BURSTS = (BURST_EVERY, BURST_LENGTH, BURST_FACTOR)
+
+
+def create_device(index):
+    return SyntheticDevice(index, ATTRIBUTES, seed=SEED, **PROFILE)
+
+
+def tick_timestamps(ts):
+    return pd.Timestamp(START_TIME) + pd.to_timedelta(ts, unit="s")
+
+
+def write_csv(path, device, names):
+    # the rows are written a chunk at a time in the TimeStamp,Id,Value layout of the sample data
+    rows = 0
+    with open(path, "wb") as f:
+        f.write(b"TimeStamp,Id,Value\n")
+        for ts, values in device_chunks(device, DURATION, RATE, *BURSTS):
+            ticks, attr_indices, values, _ = reported_rows(values)
+            timestamps = tick_timestamps(ts).strftime("%Y-%m-%d %H:%M:%S.%f+00:00").to_numpy(dtype=str)
+            f.write(encode_csv_rows(timestamps, names, ticks, attr_indices, values))
+            rows += len(values)
+    return rows
+
+
+def write_columnar(path, device, names):
+    # the chunks are appended to memory mappable arrays in the layout of the CSV cache
+    rows = 0
+    writer = ColumnarWriter(path, names)
+    for ts, values in device_chunks(device, DURATION, RATE, *BURSTS):
+        _, attr_indices, values, counts = reported_rows(values)
+        writer.write(tick_timestamps(ts[counts > 0]), counts[counts > 0], attr_indices, values)
+        rows += len(values)
+    writer.close()
+    return rows
+
+
+def write_files():
+    # one device at a time, so only a chunk of a single device is held in memory
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    names = attr_names(ATTRIBUTES)
+    rows = 0
+    for index in range(DEVICES):
+        csv_path = os.path.join(OUTPUT_DIR, f"{device_topic(PREFIX, index)}_iot_data.csv")
+        if FORMAT == "columnar":
+            rows += write_columnar(columnar_path(csv_path), create_device(index), names)
+        else:
+            rows += write_csv(csv_path, create_device(index), names)
+        if (index + 1) % 100 == 0:
+            print(f"{index + 1} devices written")
+    return DEVICES, rows
+
+
+def encode_message(ts, names, attr_indices, values, schema):
+    # the payloads of the MQTT ingest application, _ts followed by the reported attributes
+    if schema is not None:
+        return encode_packed(schema, np.append(0, attr_indices + 1), np.append(ts, values))
+    payload = {"_ts": float(ts)}
+    for attr_index, value in zip(attr_indices.tolist(), values.tolist()):
+        payload[names[attr_index]] = value
+    return encode_json(payload)
+
+
+async def publish_async(client):
+    # the devices share the tick times, at each tick every device publishes the attributes it reports.
+    # The values are generated for a chunk of ticks of all the devices at a time
+    loop = asyncio.get_running_loop()
+    names = attr_names(ATTRIBUTES)
+    devices = [create_device(index) for index in range(DEVICES)]
+    topics = [f"iot/{device_topic(PREFIX, index)}" for index in range(DEVICES)]
+    schema = None
+    if PAYLOAD_FORMAT == "packed":
+        schema = schema_id(["_ts"] + names)
+        for topic in topics:
+            await client.publish(schema_topic(topic), encode_schema(["_ts"] + names), retain=True)
+
+    speed = 0.0 if SPEED == "max" else float(SPEED)
+    chunk_seconds = max(1.0 / RATE, CHUNK_VALUES / (DEVICES * ATTRIBUTES * RATE * BURST_FACTOR))
+    messages = 0
+    rows = 0
+    start = loop.time()
+    chunk_start = 0.0
+    while chunk_start < DURATION:
+        chunk_end = min(chunk_start + chunk_seconds, DURATION)
+        ts = tick_times(chunk_start, chunk_end, RATE, *BURSTS)
+        values = np.stack([device.values(ts) for device in devices])
+        reported = ~np.isnan(values)
+        for tick, tick_ts in enumerate(ts):
+            if speed > 0:
+                delay = start + tick_ts / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            for index, topic in enumerate(topics):
+                attr_indices = np.flatnonzero(reported[index, tick])
+                if len(attr_indices) == 0:
+                    continue
+                payload = encode_message(tick_ts, names, attr_indices, values[index, tick, attr_indices], schema)
+                await client.publish(topic, payload)
+                messages += 1
+                rows += len(attr_indices)
+        lag = loop.time() - start - chunk_end / speed if speed > 0 else 0.0
+        print(f"{chunk_end:.1f}s of data published, messages: {messages} lag: {max(lag, 0.0):.3f}s")
+        chunk_start = chunk_end
+    return messages, rows
+
+
+async def stream_async():
+    host, _, port = MQTT_BROKER.rpartition(":")
+    port = int(port)
+    broker = None
+    if LOCAL_BROKER:
+        host = "127.0.0.1"
+        broker = LocalBroker()
+        port = await broker.start(host, port)
+        print(f"local broker listening on {host}:{port}")
+
+    client = MqttClient(f"python-synthetic-{os.getpid()}")
+    await client.connect(host, port)
+    try:
+        return await publish_async(client)
+    finally:
+        await client.disconnect()
+        if broker is not None:
+            await broker.close()
+
+
+if __name__ == "__main__":
+    if FORMAT not in ("csv", "columnar", "mqtt"):
+        raise Exception(f"Unknown format {FORMAT}, expected csv, columnar or mqtt.")
+    start = time.perf_counter()
+    if FORMAT == "mqtt":
+        messages, rows = asyncio.run(stream_async())
+    else:
+        messages, rows = write_files()
+    elapsed = time.perf_counter() - start
+    unit = "messages" if FORMAT == "mqtt" else "devices"
+    print(f"{messages} {unit} {rows} values in {elapsed:.1f}s: {rows / elapsed:.0f} values/s")
@@ -0,0 +1,106 @@
+# Copyright (c) 2023, NVIDIA CORPORATION. All rights reserved.
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto. Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import os
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+
+PLATFORM_SYSTEM = platform.system().lower()
+PLATFORM_MACHINE = platform.machine()
+
+if PLATFORM_MACHINE == "i686" or PLATFORM_MACHINE == "AMD64":
+    PLATFORM_MACHINE = "x86_64"
+
+CURRENT_PLATFORM = f"{PLATFORM_SYSTEM}-{PLATFORM_MACHINE}"
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config", "-c", choices=["debug", "release"], default="release")
+parser.add_argument("--platform", default=CURRENT_PLATFORM)
+parser.add_argument("--format", default="csv", choices=["csv", "columnar", "mqtt"], help="files or a live MQTT stream")
+parser.add_argument("--output", default=None, help="folder of the files, the content folder by default")
+parser.add_argument("--prefix", default="device", help="the devices are <prefix>_0000, <prefix>_0001, ...")
+parser.add_argument("--devices", default="1000", help="devices")
+parser.add_argument("--attributes", default="20", help="attributes of each device")
+parser.add_argument("--rate", default="1", help="reports of each device per second")
+parser.add_argument("--duration", default="3600", help="seconds of data")
+parser.add_argument("--noise", default="1", help="standard deviation of the gaussian noise")
+parser.add_argument("--drift", default="0", help="scale of the linear drift per second")
+parser.add_argument("--walk", default="0", help="scale of the random walk per square root second")
+parser.add_argument("--report", default="1", help="probability that an attribute is part of a report")
+parser.add_argument("--burst-every", default="0", help="seconds between the starts of bursts")
+parser.add_argument("--burst-length", default="0", help="seconds of each burst")
+parser.add_argument("--burst-factor", default="1", help="how many times as often the devices report in a burst")
+parser.add_argument("--seed", default="0", help="seed of the data")
+parser.add_argument("--speed", default="1", help="playback speed of the MQTT stream, or max")
+parser.add_argument("--broker", default="localhost:1883", help="MQTT broker host:port")
+parser.add_argument("--local-broker", action="store_true", help="publish to an in-process broker on --broker's port")
+parser.add_argument("--payload-format", default="json", choices=["json", "packed"], help="payload of the MQTT messages")
+args = parser.parse_args()
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = Path(SCRIPT_DIR).resolve().parents[1]
+
+BUILD_DIR = ROOT_DIR.joinpath("_build", args.platform, args.config)
+DEPS_DIR = ROOT_DIR.joinpath("_build", "target-deps")
+USD_BIN_DIR = DEPS_DIR.joinpath("usd", args.config, "bin")
+USD_LIB_DIR = DEPS_DIR.joinpath("usd", args.config, "lib")
+CLIENT_LIB_DIR = DEPS_DIR.joinpath("omni_client_library", args.config)
+RESOLVER_DIR = DEPS_DIR.joinpath("omni_usd_resolver", args.config)
+
+EXTRA_PATHS = [str(CLIENT_LIB_DIR), str(USD_BIN_DIR), str(USD_LIB_DIR), str(BUILD_DIR), str(RESOLVER_DIR)]
+EXTRA_PYTHON_PATHS = [
+    str(USD_LIB_DIR.joinpath("python")),
+    str(CLIENT_LIB_DIR.joinpath("bindings-python")),
+    str(BUILD_DIR.joinpath("bindings-python")),
+    str(ROOT_DIR.joinpath("source")),
+]
+
+if PLATFORM_SYSTEM == "windows":
+    os.environ["PATH"] += os.pathsep + os.pathsep.join(EXTRA_PATHS)
+    ot_bin = "carb.omnitrace.plugin.dll"
+else:
+    p = os.environ.get("LD_LIBRARY_PATH", "")
+    p += os.pathsep + os.pathsep.join(EXTRA_PATHS)
+    os.environ["LD_LIBRARY_PATH"] = p
+    ot_bin = "libcarb.omnitrace.plugin.so"
+
+os.environ["OMNI_TRACE_LIB"] = os.path.join(str(DEPS_DIR), "omni-trace", "bin", ot_bin)
+os.environ["PYTHONPATH"] = os.pathsep + os.pathsep.join(EXTRA_PYTHON_PATHS)
+os.environ["IOT_GEN_FORMAT"] = args.format
+os.environ["IOT_GEN_OUTPUT"] = os.path.abspath(args.output) if args.output else str(ROOT_DIR.joinpath("content"))
+os.environ["IOT_GEN_PREFIX"] = args.prefix
+os.environ["IOT_GEN_DEVICES"] = args.devices
+os.environ["IOT_GEN_ATTRIBUTES"] = args.attributes
+os.environ["IOT_GEN_RATE"] = args.rate
+os.environ["IOT_GEN_DURATION"] = args.duration
+os.environ["IOT_GEN_NOISE"] = args.noise
+os.environ["IOT_GEN_DRIFT"] = args.drift
+os.environ["IOT_GEN_WALK"] = args.walk
+os.environ["IOT_GEN_REPORT"] = args.report
+os.environ["IOT_GEN_BURST_EVERY"] = args.burst_every
+os.environ["IOT_GEN_BURST_LENGTH"] = args.burst_length
+os.environ["IOT_GEN_BURST_FACTOR"] = args.burst_factor
+os.environ["IOT_GEN_SEED"] = args.seed
+os.environ["IOT_GEN_SPEED"] = args.speed
+os.environ["IOT_MQTT_BROKER"] = args.broker
+os.environ["IOT_LOCAL_BROKER"] = "1" if args.local_broker else "0"
+os.environ["IOT_PAYLOAD_FORMAT"] = args.payload_format
+
+if PLATFORM_SYSTEM == "windows":
+    PYTHON_EXE = DEPS_DIR.joinpath("python", "python")
+else:
+    PYTHON_EXE = DEPS_DIR.joinpath("python", "bin", "python3")
+
+plugin_paths = DEPS_DIR.joinpath("omni_usd_resolver", args.config, "usd", "omniverse", "resources")
+os.environ["PXR_PLUGINPATH_NAME"] = str(plugin_paths)
+REQ_FILE = ROOT_DIR.joinpath("requirements.txt")
+subprocess.run(f"{PYTHON_EXE} -m pip install -r {REQ_FILE}", shell=True)
+result = subprocess.run(
+    [PYTHON_EXE, os.path.join(SCRIPT_DIR, "app.py")],
+    stderr=subprocess.STDOUT,
+)
@@ -27,15 +27,26 @@ import os
 import omni.client
 from pxr import Usd, Sdf, Gf, UsdGeom
 from pathlib import Path
-import time
 import random
+import time
+from iot_common.logs import LogBuffer
+from iot_common.metrics import MetricsExporter, registry
+from iot_common.scheduler import Scheduler
 
 OMNI_HOST = os.environ.get("OMNI_HOST", "localhost")
 BASE_URL = "omniverse://" + OMNI_HOST + "/Projects/IoT/Samples/HeadlessApp"
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 CONTENT_DIR = Path(SCRIPT_DIR).resolve().parents[1].joinpath("content")
 
-messages = []
+# log messages of the client library kept for a dump on failure or SIGUSR1, and the lowest level kept
+LOG_CAPACITY = int(os.environ.get("IOT_LOG_CAPACITY", "1000"))
+LOG_LEVEL = os.environ.get("IOT_LOG_LEVEL", "WARNING")
+# serve the metrics on http://127.0.0.1:<port>/metrics, 0 turns the endpoint off
+METRICS_PORT = int(os.environ.get("IOT_METRICS_PORT", "0"))
+# write the metrics as JSON to this file every 10 seconds
+METRICS_FILE = os.environ.get("IOT_METRICS_FILE", "")
+
+log_buffer = LogBuffer(LOG_CAPACITY)
 
 
 class LivePrim:
@@ -102,17 +113,13 @@ class LivePrim:
         self._rotation[1] += self._rotation_increment[1]
         self._rotation[2] += self._rotation_increment[2]
 
-    def write_to_live(self, live_layer):
+    def write_to_live(self, live_layer, steps=1):
         # write the transformation the usd prim attributes
-        self._increment()
+        for _ in range(steps):
+            self._increment()
         self._rotateXYZOp.Set(self._rotation)
 
 
-def log_handler(thread, component, level, message):
-    # print(message)
-    messages.append((thread, component, level, message))
-
-
 async def initialize_async():
     # copy a the Conveyor Belt to the target nucleus server
     IOT_TOPIC = "Dancing_Cubes"
@@ -163,23 +170,38 @@ def run(stage, live_layer):
     live_prim = LivePrim(stage)
     omni.client.live_process()
 
-    for x in range(iterations):
+    # frames are paced on absolute deadlines, frames that are already late are dropped
+    # and the animation is advanced past them so it keeps to the wall clock
+    scheduler = Scheduler()
+    scheduler.start()
+    frame = 0
+    while frame < iterations:
+        lag = scheduler.wait(frame * delay)
+        steps = min(1 + int(lag / delay), iterations - frame)
+        start = time.perf_counter()
         with Sdf.ChangeBlock():
-            live_prim.write_to_live(live_layer)
+            live_prim.write_to_live(live_layer, steps)
+        applied = time.perf_counter()
         omni.client.live_process()
-        time.sleep(delay)
+        registry.add_time("apply", applied - start)
+        registry.add_time("live_process", time.perf_counter() - applied)
+        registry.observe("latency", lag)
+        registry.count("frames")
+        scheduler.drop(steps - 1)
+        frame += steps
+
+    print(scheduler.report())
 
 
 if __name__ == "__main__":
     omni.client.initialize()
-    omni.client.set_log_level(omni.client.LogLevel.DEBUG)
-    omni.client.set_log_callback(log_handler)
+    log_buffer.install(LOG_LEVEL)
+    exporter = MetricsExporter(registry, METRICS_PORT, METRICS_FILE or None).start()
     try:
         stage, live_layer = asyncio.run(initialize_async())
         run(stage, live_layer)
     except:
-        print('---- LOG MESSAGES ---')
-        print(*messages, sep='\n')
-        print('----')
+        log_buffer.dump()
     finally:
+        exporter.stop()
         omni.client.shutdown()
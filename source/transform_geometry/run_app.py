@@ -25,6 +25,12 @@ parser.add_argument("--username", "-u")
 parser.add_argument("--password", "-p")
 parser.add_argument("--config", "-c", choices=["debug", "release"], default="release")
 parser.add_argument("--platform", default=CURRENT_PLATFORM)
+parser.add_argument(
+    "--log-level", default="warning", choices=["debug", "verbose", "info", "warning", "error"], help="client log level"
+)
+parser.add_argument("--log-capacity", default="1000", help="client log messages kept for a dump on failure or SIGUSR1")
+parser.add_argument("--metrics-port", default="0", help="serve metrics on http://127.0.0.1:<port>/metrics, 0 is off")
+parser.add_argument("--metrics-file", default="", help="write the metrics as JSON to this file every 10 seconds")
 args = parser.parse_args()
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -42,6 +48,7 @@ EXTRA_PYTHON_PATHS = [
     str(USD_LIB_DIR.joinpath("python")),
     str(CLIENT_LIB_DIR.joinpath("bindings-python")),
     str(BUILD_DIR.joinpath("bindings-python")),
+    str(ROOT_DIR.joinpath("source")),
 ]
 
 if PLATFORM_SYSTEM == "windows":
@@ -58,6 +65,10 @@ os.environ["PYTHONPATH"] = os.pathsep + os.pathsep.join(EXTRA_PYTHON_PATHS)
 os.environ["OMNI_USER"] = args.username
 os.environ["OMNI_PASS"] = args.password
 os.environ["OMNI_HOST"] = args.server
+os.environ["IOT_LOG_LEVEL"] = args.log_level
+os.environ["IOT_LOG_CAPACITY"] = args.log_capacity
+os.environ["IOT_METRICS_PORT"] = args.metrics_port
+os.environ["IOT_METRICS_FILE"] = args.metrics_file
 
 if PLATFORM_SYSTEM == "windows":
     PYTHON_EXE = DEPS_DIR.joinpath("python", "python")